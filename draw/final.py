@@ -1,5 +1,6 @@
 """Final rendering."""
 
+from concurrent.futures import ThreadPoolExecutor
 from time import time, sleep
 import numpy as np
 import pyluxcore as plc
@@ -8,7 +9,7 @@ from ..export.aovs import get_denoiser_imgpipeline_props
 from ..properties.denoiser import LuxCoreDenoiser
 from ..properties.display import LuxCoreDisplaySettings
 from ..utils import view_layer as utils_view_layer
-from .utils import ConvertFilmChannelOutput
+from .utils import ConvertFilmChannelOutput, FilmBufferPool
 
 
 # Note: RGB_IMAGEPIPELINE and RGBA_IMAGEPIPELINE are missing here because they
@@ -42,6 +43,26 @@ AOVS_WITH_ID = {
 DEFAULT_AOV_SETTINGS = ConvertFilmChannelOutput(3, np.float32, 3)
 
 
+class _FilmRefresh:
+    """The passes of one film refresh.
+
+    Passes in imports are read from the film (possibly on a background
+    thread), all passes in pass_names are written into the render result.
+    """
+
+    def __init__(self, layer_name, samples, render_stopped, debug):
+        self.layer_name = layer_name
+        self.samples = samples
+        self.render_stopped = render_stopped
+        self.debug = debug
+        # Tuples of (pass_name, output_type, index, convert_func,
+        # execute_imagepipeline, refresh_policy)
+        self.imports = []
+        self.pass_names = []
+        # Stage name -> duration in seconds
+        self.timings = {}
+
+
 class FrameBufferFinal:
     """FrameBuffer for final render."""
 
@@ -60,50 +81,140 @@ class FrameBufferFinal:
             self._combined_output_type = plc.FilmOutputType.RGB_IMAGEPIPELINE
             self._convert_combined = ConvertFilmChannelOutput(3, np.float32, 4)
 
+        # Memory for the film readback, reused across refreshes. Each pass
+        # has its own slot, so the last import of a pass can be written into
+        # the render result again without reading it from the film.
+        self._buffers = FilmBufferPool()
+        # Pass name -> pixels of the last import
+        self._pixels = {}
+        # Pass name -> samples at the last import, for passes that are not
+        # imported on every film refresh
+        self._pass_samples = {}
+
+        # Background film readback, see draw_async()
+        self._executor = None
+        self._pending = None
+
         # How long the last run of the denoiser took, in seconds
         self.denoiser_last_elapsed_time = 0
         self.denoiser_last_samples = 0
 
     def draw(self, engine, session, scene, render_stopped):
         """Draw rendering (callback)."""
+        # A synchronous refresh supersedes a running background refresh
+        self.wait_async(engine, blit=False)
+
+        refresh = self._prepare(engine, session, scene, render_stopped)
+        self._read(session, refresh)
+        self._blit(engine, refresh)
+        # Reset the refresh button
+        LuxCoreDisplaySettings.refresh = False
+
+        if render_stopped:
+            self._shutdown_executor()
+
+    def draw_async(self, engine, session, scene):
+        """
+        Start a film refresh with the film readback and conversion running on
+        a background thread, so the render loop is not blocked. The result is
+        written into Blender's render result by poll_async() or wait_async().
+        Does nothing if the previous background refresh is still running.
+        """
+        if self._pending:
+            return
+
+        refresh = self._prepare(engine, session, scene, render_stopped=False)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="BLC_film"
+            )
+        future = self._executor.submit(self._read, session, refresh)
+        self._pending = (future, refresh)
+
+    def poll_async(self, engine):
+        """Write the result of a finished background refresh into Blender.
+        Returns True if a result was written."""
+        if self._pending and self._pending[0].done():
+            return self.wait_async(engine)
+        return False
+
+    def wait_async(self, engine, blit=True):
+        """Wait for a running background refresh. Has to be called before
+        the session is modified (e.g. paused or updated)."""
+        if not self._pending:
+            return False
+
+        future, refresh = self._pending
+        self._pending = None
+        future.result()
+
+        if blit:
+            self._blit(engine, refresh)
+        return blit
+
+    def _shutdown_executor(self):
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _prepare(self, engine, session, scene, render_stopped):
+        """Decide which passes need to be read from the film. Runs the
+        denoiser if requested. Has to run on the render thread."""
+        prepare_start = time()
         active_layer = utils_view_layer.State.active_view_layer
         try:
             scene_layer_name = scene.view_layers[active_layer].name
         except KeyError:
             scene_layer_name = ""
 
-        result = engine.begin_result(
-            0, 0, self._width, self._height, layer=scene_layer_name
+        if engine.is_preview:
+            samples = 0
+        else:
+            stats = session.GetStats()
+            samples = stats.Get("stats.renderengine.pass").GetInt()
+
+        refresh = _FilmRefresh(
+            scene_layer_name, samples, render_stopped, scene.luxcore.debug.enabled
         )
+        # Import all passes when ending the render or when the user presses
+        # the refresh button
+        force_refresh = render_stopped or LuxCoreDisplaySettings.refresh
+
         # Regardless of the scene render layers, the result always only
         # contains one layer
-        render_layer = result.layers[0]
-
-        combined = render_layer.passes["Combined"]
-        film = session.GetFilm()
-        if self._combined_output_type == plc.FilmOutputType.RGB_IMAGEPIPELINE:
-            size = self._width * self._height
-            pixels = np.empty([size, 3], dtype=np.float32)
-            film.GetOutputFloat(self._combined_output_type, pixels)
-            pixels = np.c_[pixels, np.ones(size, dtype=np.float32)]
-            combined.rect.foreach_set(pixels.ravel())
-        elif (
-            self._combined_output_type == plc.FilmOutputType.RGBA_IMAGEPIPELINE
-        ):
-            size = self._width * self._height
-            pixels = np.empty([size, 4], dtype=np.float32)
-            film.GetOutputFloat(self._combined_output_type, pixels)
-            combined.rect.foreach_set(pixels.ravel())
-        else:
-            raise ValueError(
-                f"Unhandled Output Type {self._combined_output_type}"
+        refresh.imports.append(
+            (
+                "Combined",
+                self._combined_output_type,
+                0,
+                self._convert_combined,
+                True,
+                "EVERY",
             )
+        )
+        refresh.pass_names.append("Combined")
 
         # Import AOVs, import light groups and trigger denoiser,
         # but only in final render, not in material preview mode
         if not engine.is_preview:
             # AOVs
             scene_layer_aovs = scene.view_layers[active_layer].luxcore.aovs
+            refresh_samples = scene_layer_aovs.refresh_samples
+
+            def add(output_name, output_type, refresh_policy, index=0, lightgroup_name=""):
+                self._add_pass(
+                    refresh,
+                    engine,
+                    output_name,
+                    output_type,
+                    refresh_policy,
+                    force_refresh,
+                    refresh_samples,
+                    index=index,
+                    lightgroup_name=lightgroup_name,
+                )
+
             enabled_aov_outputs = (
                 item
                 for item in plc.FilmOutputType.names.items()
@@ -111,16 +222,11 @@ class FrameBufferFinal:
                 if getattr(scene_layer_aovs, item[0].lower(), False)
             )
             for output_name, output_type in enabled_aov_outputs:
-                try:
-                    self._import_aov(
-                        output_name,
-                        output_type,
-                        render_layer,
-                        session,
-                        engine,
-                    )
-                except RuntimeError as error:
-                    print(f"Error on import of AOV {output_name}: {error}")
+                add(
+                    output_name,
+                    output_type,
+                    scene_layer_aovs.get_refresh_policy(output_name),
+                )
 
             # Light groups
             lightgroup_pass_names = scene.luxcore.lightgroups.get_pass_names()
@@ -132,45 +238,37 @@ class FrameBufferFinal:
                 if i in engine.exporter.lightgroup_cache
             )
             for i, name in enabled_lightgroups:
-                output_name = "RADIANCE_GROUP"
-                output_type = plc.FilmOutputType.RADIANCE_GROUP
-                try:
-                    self._import_aov(
-                        output_name,
-                        output_type,
-                        render_layer,
-                        session,
-                        engine,
-                        True,
-                        i,
-                        name,
-                    )
-                except RuntimeError as error:
-                    print(
-                        "Error on import of Lightgroup AOV of group "
-                        f"{name}: {error}"
-                    )
-
-            self._refresh_denoiser(
-                engine, session, scene, render_layer, render_stopped
-            )
+                add(
+                    "RADIANCE_GROUP",
+                    plc.FilmOutputType.RADIANCE_GROUP,
+                    scene_layer_aovs.refresh_light,
+                    index=i,
+                    lightgroup_name=name,
+                )
 
-        engine.end_result(result)
-        # Reset the refresh button
-        LuxCoreDisplaySettings.refresh = False
+            self._refresh_denoiser(engine, session, scene, refresh)
+
+        refresh.timings["prepare"] = time() - prepare_start
+        return refresh
 
-    def _import_aov(
+    def _add_pass(
         self,
+        refresh,
+        engine,
         output_name,
         output_type,
-        render_layer,
-        session,
-        engine,
+        refresh_policy,
+        force_refresh,
+        refresh_samples,
         execute_imagepipeline=True,
         index=0,
         lightgroup_name="",
     ):
-        """Import AOV into render layer."""
+        """Add an AOV to the refresh.
+
+        Passes with a refresh policy other than EVERY are only read from the
+        film when they are stale, otherwise their last import is re-used.
+        """
         # print(output_name)  # Debug
 
         convert_func = AOVS.get(output_name, DEFAULT_AOV_SETTINGS)
@@ -197,42 +295,116 @@ class FrameBufferFinal:
         else:
             pass_name = output_name
 
-        blender_pass = render_layer.passes[pass_name]
+        refresh.pass_names.append(pass_name)
+
+        if force_refresh or self._is_pass_stale(
+            pass_name, refresh_policy, refresh.samples, refresh_samples
+        ):
+            refresh.imports.append(
+                (
+                    pass_name,
+                    output_type,
+                    index,
+                    convert_func,
+                    execute_imagepipeline,
+                    refresh_policy,
+                )
+            )
+
+    def _is_pass_stale(self, pass_name, refresh_policy, samples, refresh_samples):
+        if refresh_policy == "EVERY":
+            return True
+        if pass_name not in self._pixels:
+            # Never imported
+            return refresh_policy != "FINAL"
+        if refresh_policy == "FINAL":
+            return False
+        # AFTER_SAMPLES: import once at the start and once more when the
+        # sample threshold is crossed
+        last_samples = self._pass_samples.get(pass_name, 0)
+        return last_samples < refresh_samples <= samples
+
+    def _read(self, session, refresh):
+        """Read the passes from the film into their buffers. Only uses the
+        LuxCore session, so it can run on a background thread."""
+        read_start = time()
+        film = session.GetFilm()
 
-        # Convert and copy the buffer into the blender_pass.rect
-        convert_func(
-            session.GetFilm(),
+        for (
+            pass_name,
             output_type,
             index,
-            self._width,
-            self._height,
-            blender_pass,
+            convert_func,
             execute_imagepipeline,
+            refresh_policy,
+        ) in refresh.imports:
+            try:
+                self._pixels[pass_name] = convert_func(
+                    film,
+                    output_type,
+                    index,
+                    self._width,
+                    self._height,
+                    None,
+                    execute_imagepipeline,
+                    self._buffers,
+                    dst_slot=pass_name,
+                )
+            except RuntimeError as error:
+                print(f'Error on import of pass "{pass_name}": {error}')
+                continue
+
+            if refresh_policy != "EVERY":
+                self._pass_samples[pass_name] = refresh.samples
+
+        refresh.timings["readback"] = time() - read_start
+
+    def _blit(self, engine, refresh):
+        """Write the pixels of all passes into a new render result."""
+        blit_start = time()
+        result = engine.begin_result(
+            0, 0, self._width, self._height, layer=refresh.layer_name
         )
+        # Regardless of the scene render layers, the result always only
+        # contains one layer
+        render_layer = result.layers[0]
 
-    def _refresh_denoiser(
-        self, engine, session, scene, render_layer, render_stopped
-    ):
+        for pass_name in refresh.pass_names:
+            pixels = self._pixels.get(pass_name)
+            # If we do not write something into the result, the pass will be
+            # black. This only happens for passes that were never imported.
+            if pixels is not None:
+                render_layer.passes[pass_name].rect.foreach_set(pixels.ravel())
+
+        engine.end_result(result)
+        refresh.timings["blit"] = time() - blit_start
+
+        if refresh.debug:
+            megapixels = self._width * self._height / 1e6
+            total = sum(refresh.timings.values())
+            stages = ", ".join(
+                f"{stage} {elapsed * 1000:.1f} ms"
+                for stage, elapsed in refresh.timings.items()
+            )
+            print(
+                f"Film refresh took {total * 1000:.1f} ms "
+                f"({total * 1000 / megapixels:.2f} ms/MP): {stages}"
+            )
+
+    def _refresh_denoiser(self, engine, session, scene, refresh):
         """Refresh denoiser, taking aov into account."""
         if not engine.has_denoiser():
             return
 
         output_name = engine.DENOISED_OUTPUT_NAME
 
-        output_type = (
-            plc.FilmOutputType.RGBA_IMAGEPIPELINE
-            if self._transparent
-            else plc.FilmOutputType.RGB_IMAGEPIPELINE
-        )
-
         # Refresh when ending the render (Esc/halt condition) or when the user
         # presses the refresh button
-        refresh_denoised = render_stopped or LuxCoreDenoiser.refresh
+        refresh_denoised = refresh.render_stopped or LuxCoreDenoiser.refresh
 
-        stats = engine.session.GetStats()
-        samples = stats.Get("stats.renderengine.pass").GetInt()
+        samples = refresh.samples
 
-        if render_stopped and samples == self.denoiser_last_samples:
+        if refresh.render_stopped and samples == self.denoiser_last_samples:
             # No new samples, do not run the denoiser. Saves time when the user
             # cancels the render wile the denoiser is running, for example.
             print(
@@ -271,19 +443,8 @@ class FrameBufferFinal:
                     sleep(1)
 
                 self.denoiser_last_elapsed_time = round(time() - start)
-
-                # Import the denoised image without executing the imagepipeline
-                # again
-                self._import_aov(
-                    output_name,
-                    output_type,
-                    render_layer,
-                    session,
-                    engine,
-                    execute_imagepipeline=False,
-                )
             except RuntimeError as error:
-                print(f"Error on import of denoised result: {error}")
+                print(f"Error on denoising: {error}")
 
             if not was_paused and session.IsInPause():
                 session.Resume()
@@ -294,15 +455,22 @@ class FrameBufferFinal:
             # Reset the refresh button
             LuxCoreDenoiser.refresh = False
             engine.update_stats("Denoiser Done", f"Elapsed: {elapsed} s")
+
+        # Import the denoised image without executing the imagepipeline again.
+        # It only changes when the denoiser runs, otherwise the result from the
+        # last denoiser run is re-used.
+        if refresh_denoised or output_name not in self._pixels:
+            refresh_policy = "EVERY"
         else:
-            # If we do not write something into the result, the image will be
-            # black.
-            # So we re-use the result from the last denoiser run.
-            self._import_aov(
-                output_name,
-                output_type,
-                render_layer,
-                session,
-                engine,
-                execute_imagepipeline=False,
-            )
+            refresh_policy = "FINAL"
+
+        self._add_pass(
+            refresh,
+            engine,
+            output_name,
+            None,
+            refresh_policy,
+            False,
+            0,
+            execute_imagepipeline=False,
+        )
@@ -19,6 +19,34 @@ import bpy
 import pyluxcore
 
 
+class FilmBufferPool:
+    """
+    Reusable float32 scratch memory for film readback.
+
+    Each slot is backed by one flat array that only grows, and buffers are
+    handed out as views into it, so refreshing the film does not allocate
+    new memory for every pass.
+    """
+
+    def __init__(self):
+        self._slots = {}
+
+    def get(self, slot, count, depth, dtype=np.float32):
+        """Return a (count, depth) buffer of dtype backed by the given slot.
+
+        dtype must have an itemsize of 4 bytes (float32 or uint32).
+        """
+        size = count * depth
+        backing = self._slots.get(slot)
+        if backing is None or len(backing) < size:
+            backing = np.empty(size, dtype=np.float32)
+            self._slots[slot] = backing
+        return backing[:size].view(dtype).reshape(count, depth)
+
+    def clear(self):
+        self._slots.clear()
+
+
 class ConvertFilmChannelOutput:
     """Inject a LuxCore film output into a Blender rendering buffer."""
 
@@ -68,23 +96,35 @@ class ConvertFilmChannelOutput:
         height: int,
         render_pass: bpy.types.RenderPass,
         execute_image_pipeline: bool,
+        buffers: FilmBufferPool = None,
+        dst_slot: str = "dst",
     ):
-        # Destination depth - in most cases, it is 4; but for UV, it will be 3
+        """Returns the converted pixels. If render_pass is None, they are
+        not copied into Blender (e.g. when running on a background thread)."""
+        if buffers is None:
+            buffers = FilmBufferPool()
+
+        count = width * height
+        src_depth = self.src_depth
         dst_depth = self.dst_depth
+        # Destination buffer, in the layout expected by Blender
+        dst = buffers.get(dst_slot, count, dst_depth)
+
+        # Let LuxCore write directly into the destination if the layout
+        # matches, otherwise into a scratch buffer that is converted below
+        if self.src_dtype == np.float32 and src_depth == dst_depth:
+            src = dst
+        else:
+            src = buffers.get("src", count, src_depth, self.src_dtype)
 
-        # Get LuxCore data in a float buffer
-        buf = np.empty([width, height, self.src_depth], dtype=self.src_dtype)
         if self.src_dtype == np.float32:
             film.GetOutputFloat(
-                output_type, buf, output_index, execute_image_pipeline
+                output_type, src, output_index, execute_image_pipeline
             )
         elif self.src_dtype == np.uint32:
             film.GetOutputUInt(
-                output_type, buf, output_index, execute_image_pipeline
+                output_type, src, output_index, execute_image_pipeline
             )
-            # Convert buffer to float
-            buf = buf.astype(np.float32)
-
         else:
             raise ValueError(
                 "ConvertFilmChannelOutput: "
@@ -92,43 +132,42 @@ class ConvertFilmChannelOutput:
             )
 
         # Reshape source buffer
-        if self.src_depth == 1 and self.dst_depth == 4 and self.src_dtype == np.float32:
+        if src is dst:
+            pass
+        elif src_depth == 1 and dst_depth == 4 and self.src_dtype == np.float32:
             # Repeat on RGB and pad with 1.f in alpha channel
-            buf = np.concat(
-                (buf.repeat(3, axis=-1), np.ones(shape=buf.shape)), axis=2
-            )
-        elif self.src_depth == 1 and self.dst_depth == 1 and self.src_dtype == np.uint32:
+            dst[:, :3] = src
+            dst[:, 3] = 1
+        elif src_depth == 1 and dst_depth == 1 and self.src_dtype == np.uint32:
+            # Convert buffer to float
+            np.copyto(dst, src, casting="unsafe")
             if self.is_id:
-                buf /= 2**32
-
-        elif self.src_depth == 2 and self.dst_depth == 3:
+                dst /= 2**32
+        elif src_depth == 2 and dst_depth == 3:
             # This is for UV channel
             # We need to pad the UV pass to 3 elements (Blender can't handle 2
             # elements). The third channel is a mask that is 1 where a UV map
             # exists and 0 otherwise.
-            pad = ((buf[..., 0] != 0) & (buf[..., 1] != 0)).astype(np.float32)
-            pad = pad.reshape(width, height, 1)
-            buf = np.concat((buf, pad), axis=2)
-            dst_depth = 3
-        elif self.src_depth == 3 and self.dst_depth == 4:
+            dst[:, :2] = src
+            dst[:, 2] = (src[:, 0] != 0) & (src[:, 1] != 0)
+        elif src_depth == 3 and dst_depth == 4:
             # Pad with 1.f in alpha channel
-            buf = np.concat((buf, np.ones(shape=buf.shape)), axis=2)
-        elif self.src_depth == self.dst_depth and self.src_dtype == np.float32:
-            pass
+            dst[:, :3] = src
+            dst[:, 3] = 1
         else:
             raise ValueError(
-                f"AOV - Inconsistent depths: {self.src_depth} / {self.dst_depth}"
+                f"AOV - Inconsistent depths: {src_depth} / {dst_depth}"
             )
 
         # Normalize if required.
         if self.normalize:
             # We only normalize channels 0 to 2, as channel 3 is intended for alpha
-            hi_channel = min(self.src_depth, 2)
-            buf_view = buf[..., 0:hi_channel]  # Basic slicing, this is a view
-            assert buf_view.base is not None
+            hi_channel = min(src_depth, 2)
+            buf_view = dst[:, 0:hi_channel]  # Basic slicing, this is a view
             if max_value := np.max(buf_view):
                 buf_view /= max_value
 
         # Inject into Blender buffer
-        outbuf = np.reshape(buf, (-1, dst_depth)).astype(np.float32)
-        render_pass.rect.foreach_set(outbuf.ravel())
+        if render_pass is not None:
+            render_pass.rect.foreach_set(dst.ravel())
+        return dst
@@ -68,6 +68,7 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
     engine.reset()
     engine.exporter = export.Exporter(statistics)
     engine.session = engine.exporter.create_session(depsgraph, engine=engine, view_layer=view_layer)
+    LuxCoreErrorLog.refresh_ui()
     scene = depsgraph.scene_eval
 
     if engine.session is None:
@@ -79,10 +80,13 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
 
     # Create session
     start = time()
-    engine.session.Start()
+    with engine.exporter.profiler.span("Session Start"):
+        engine.session.Start()
     session_init_time = time() - start
     print("Session started in %.1f s" % session_init_time)
     statistics.session_init_time.value = session_init_time
+    engine.exporter.write_profile(scene)
+    LuxCoreErrorLog.refresh_ui()
 
     config = engine.session.GetRenderConfig()
 
@@ -116,6 +120,9 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
     FAST_REFRESH_DURATION = 1 if engine.is_animation else 5
 
     while True:
+        # Show the result of a finished background film refresh
+        engine.framebuffer.poll_async(engine)
+
         now = time()
         manual_refresh_requested = LuxCoreDisplaySettings.refresh or LuxCoreDenoiser.refresh
         update_stats = (now - last_stat_refresh) > _stat_refresh_interval(start, scene)
@@ -124,16 +131,21 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
 
         if LuxCoreDisplaySettings.paused:
             if not engine.session.IsInPause():
+                engine.framebuffer.wait_async(engine)
                 engine.session.Pause()
                 utils_render.update_status_msg(stats, engine, depsgraph.scene, config, time_until_film_refresh=0)
                 engine.framebuffer.draw(engine, engine.session, depsgraph.scene, render_stopped=False)
                 engine.update_stats("", "Paused")
         else:
             if engine.session.IsInPause():
+                engine.framebuffer.wait_async(engine)
                 engine.session.Resume()
 
         # Do session update (imagepipeline, lightgroups)
         changes = engine.exporter.get_changes(depsgraph)
+        if changes:
+            # The film must not be read while the session is modified
+            engine.framebuffer.wait_async(engine)
         engine.exporter.update_session(changes, engine.session)
 
         if engine.session.IsInPause():
@@ -160,7 +172,12 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
                 last_stat_refresh = now
                 if draw_film:
                     # Show updated film (this operation is expensive)
-                    engine.framebuffer.draw(engine, engine.session, depsgraph.scene, render_stopped=False)
+                    if fast_refresh or changes or manual_refresh_requested:
+                        engine.framebuffer.draw(engine, engine.session, depsgraph.scene, render_stopped=False)
+                    else:
+                        # Periodic refresh, read the film in the background so
+                        # we can keep checking the halt conditions meanwhile
+                        engine.framebuffer.draw_async(engine, engine.session, depsgraph.scene)
                     last_film_refresh = now
 
             utils_render.update_status_msg(stats, engine, depsgraph.scene, config, time_until_film_refresh)
@@ -169,6 +186,8 @@ def _render_layer(engine, depsgraph, statistics, view_layer):
             # Only do this if clamping is disabled, otherwise the value is meaningless.
             samples = stats.Get("stats.renderengine.pass").GetInt()
             if not checked_optimal_clamp and samples > clamp_warmup_samples:
+                # Reads the film, which might still be read by a background refresh
+                engine.framebuffer.wait_async(engine)
                 clamp_value = utils_render.find_suggested_clamp_value(engine.session, depsgraph.scene)
                 print("Recommended clamp value:", clamp_value)
                 checked_optimal_clamp = True
@@ -137,7 +137,8 @@ def _export_mat_scene(engine, depsgraph, active_mat):
             for idx, (shape_name, mat_index) in enumerate(mesh_definitions):
                 shape = shape_name
                 lux_mat_name, mat_props, node_tree = export_material(obj, mat_index, exporter, depsgraph, is_viewport_render)
-                scene_props.Set(mat_props)
+                if mat_props is not None:
+                    scene_props.Set(mat_props)
                 mat_names.append(lux_mat_name)
 
                 if node_tree:
@@ -108,6 +108,7 @@ def view_update(engine, context, depsgraph, changes=None):
             engine.session = engine.exporter.create_session(
                 depsgraph, context, engine=engine
             )
+            LuxCoreErrorLog.refresh_ui()
             # Start in separate thread to avoid blocking the UI
             engine.starting_session = True
             engine.is_first_viewport_start = False
@@ -151,6 +152,7 @@ def view_update(engine, context, depsgraph, changes=None):
         engine.session = engine.exporter.update(
             depsgraph, context, engine.session, changes
         )
+        LuxCoreErrorLog.refresh_ui()
         engine.viewport_start_time = time()
 
         if engine.framebuffer:
@@ -223,7 +225,9 @@ def view_draw(engine, context, depsgraph):
 
     # Check for changes because some actions in Blender (e.g. moving the viewport
     # camera) do not trigger a view_update() call, but only a view_draw() call.
-    changes = engine.exporter.get_viewport_changes(depsgraph, context)
+    changes = engine.exporter.get_viewport_changes(
+        depsgraph, context, only_if_view_changed=True
+    )
 
     if changes & export.Change.REQUIRES_VIEW_UPDATE:
         engine.tag_redraw()
@@ -238,6 +242,7 @@ def view_draw(engine, context, depsgraph):
         engine.session = engine.exporter.update(
             depsgraph, context, engine.session, changes
         )
+        LuxCoreErrorLog.refresh_ui()
         engine.viewport_start_time = time()
         framebuffer.reset_denoiser()
 
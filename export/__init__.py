@@ -1,3 +1,5 @@
+import os
+import tempfile
 from time import time
 
 _needs_reload = "bpy" in locals()
@@ -8,6 +10,9 @@ from .. import utils
 from ..utils import render as utils_render
 from ..utils import compatibility as utils_compatibility
 from ..utils.errorlog import LuxCoreErrorLog
+from ..utils.profiler import ExportProfiler
+from ..properties import imagepipeline as imagepipeline_settings
+from ..properties import halt as halt_settings
 from . import (
     caches,
     camera,
@@ -20,6 +25,8 @@ from . import (
     halt,
     world,
     mesh_converter,
+    mesh_cache,
+    smoke,
 )
 from .light import WORLD_BACKGROUND_LIGHT_NAME
 from .caches.object_cache import supports_live_transform
@@ -40,6 +47,8 @@ if _needs_reload:
         world,
         utils,
         mesh_converter,
+        mesh_cache,
+        smoke,
     )
     for module in modules:
         importlib.reload(module)
@@ -86,6 +95,7 @@ class Exporter(object):
 
         self.config_cache = caches.StringCache()
         self.camera_cache = caches.CameraCache()
+        self.viewport_cache = caches.ViewportCache()
         # self.object_cache = caches.ObjectCache()
         self.object_cache2 = caches.ObjectCache2()
         self.material_cache = caches.MaterialCache()
@@ -93,7 +103,18 @@ class Exporter(object):
         self.world_cache = caches.WorldCache()
         self.imagepipeline_cache = caches.StringCache()
         self.halt_cache = caches.StringCache()
+        # Edit counts of the imagepipeline and halt settings at the time of the
+        # last conversion, only used in final render (see get_changes())
+        self.imagepipeline_edit_count = None
+        self.halt_edit_count = None
         self.motion_blur_enabled = False
+        # Persistent on-disk mesh cache, only used in final render if enabled
+        self.mesh_cache = None
+        # Merge identical face corners of exported meshes, see mesh_converter.weld()
+        self.weld_vertices = False
+        # Records timing spans of the export, only enabled in final render
+        # if the user enabled it in the debug settings
+        self.profiler = ExportProfiler()
 
         # A dictionary with the following mapping:
         # {node_key: luxcore_name}
@@ -104,6 +125,18 @@ class Exporter(object):
         # to export, because we don't have one global properties object.
         self.node_cache = {}
 
+        # The material whose node tree is currently exported
+        self.exported_material = None
+
+        # Node types and shape requirements of node trees, see utils.node.NodeTreeFeatures
+        # {node tree pointer: NodeTreeFeatures}
+        self.node_tree_features = {}
+
+        # Results of material.convert() for materials used by objects, so shared
+        # materials are only converted and parsed once per export
+        # {(material pointer, is_viewport_render): (luxcore_name, recorded warnings)}
+        self.converted_materials = {}
+
         # If a light/material uses a lightgroup, the id is stored here during export
         self.lightgroup_cache = set()
 
@@ -123,11 +156,27 @@ class Exporter(object):
         if stats:
             stats.reset()
 
+        debug = scene.luxcore.debug
+        self.profiler = ExportProfiler(
+            enabled=debug.enabled and debug.profile_export and not context
+        )
+        profiler = self.profiler
+
         # We have to run the compatibility code before export because it could
         # be that the user has linked/appended assets with node trees from
         # previous versions of the addon since opening the .blend file.
         utils_compatibility.run()
 
+        self.weld_vertices = scene.luxcore.config.weld_vertices
+        mesh_cache_settings = scene.luxcore.config.mesh_cache
+        if mesh_cache_settings.enabled and not context:
+            try:
+                self.mesh_cache = mesh_cache.PersistentMeshCache.from_settings(
+                    mesh_cache_settings, scene, stats
+                )
+            except OSError as error:
+                LuxCoreErrorLog.add_warning(f"Mesh cache disabled: {error}")
+
         # Scene
         image_resize_policy_props = (
             scene.luxcore.config.image_resize_policy.convert()
@@ -139,10 +188,11 @@ class Exporter(object):
 
         # Camera (needs to be parsed first because it is needed for hair
         # tesselation)
-        self.camera_cache.diff(
-            self, scene, depsgraph, context
-        )  # Init camera cache
-        luxcore_scene.Parse(self.camera_cache.props)
+        with profiler.span("Camera"):
+            self.camera_cache.diff(
+                self, scene, depsgraph, context
+            )  # Init camera cache
+            luxcore_scene.Parse(self.camera_cache.props)
 
         if utils.is_valid_camera(scene.camera):
             blur_settings = scene.camera.data.luxcore.motion_blur
@@ -156,19 +206,24 @@ class Exporter(object):
 
         # Objects and lights
         is_viewport_render = context is not None
-        instances = self.object_cache2.first_run(
-            self,
-            depsgraph,
-            view_layer,
-            engine,
-            luxcore_scene,
-            scene_props,
-            context,
-        )
+        with profiler.span("Objects"):
+            instances = self.object_cache2.first_run(
+                self,
+                depsgraph,
+                view_layer,
+                engine,
+                luxcore_scene,
+                scene_props,
+                context,
+            )
         if instances is None:
             # Export was cancelled by user
+            smoke.free_buffers()
             return None
 
+        if self.mesh_cache:
+            self.mesh_cache.evict()
+
         if is_viewport_render:
             self.visibility_cache.init(depsgraph, context)
 
@@ -177,13 +232,15 @@ class Exporter(object):
         # is the same on every frame
         if not context and utils.is_valid_camera(scene.camera):
             if self.motion_blur_enabled:
-                motion_blur_props, cam_moving = motion_blur.convert(
-                    context,
-                    engine,
-                    scene,
-                    depsgraph,
-                    self.object_cache2.exported_objects,
-                )
+                with profiler.span("Motion Blur"):
+                    motion_blur_props, cam_moving = motion_blur.convert(
+                        context,
+                        engine,
+                        scene,
+                        depsgraph,
+                        self.object_cache2.exported_objects,
+                        instances,
+                    )
 
                 if cam_moving:
                     # Re-export the camera with motion blur enabled
@@ -196,8 +253,13 @@ class Exporter(object):
                 scene_props.Set(motion_blur_props)
 
         # World
-        world_props = world.convert(self, depsgraph, scene, is_viewport_render)
-        scene_props.Set(world_props)
+        with profiler.span("World"):
+            world_props = world.convert(
+                self, depsgraph, scene, is_viewport_render
+            )
+            scene_props.Set(world_props)
+        # All smoke grids were copied into the properties by now
+        smoke.free_buffers()
 
         if (
             scene.luxcore.debug.enabled
@@ -206,14 +268,19 @@ class Exporter(object):
             print("-" * 50)
             print("DEBUG: Scene Properties:\n")
             print(
-                "(Note: does not contain dupli props, only the props of the base object)\n"
+                "(Note: does not contain dupli props, only the props of the base object, "
+                "and no props that were parsed early to stream duplis)\n"
             )
             print(scene_props)
             print("-" * 50)
-        luxcore_scene.Parse(scene_props)
+        with profiler.span("Parse", properties=scene_props.GetSize()):
+            luxcore_scene.Parse(scene_props)
         # We can only duplicate the instances *after* the scene_props were
         # parsed so the base objects are available for luxcore_scene
-        self.object_cache2.duplicate_instances(instances, luxcore_scene, stats)
+        with profiler.span("DuplicateObject"):
+            self.object_cache2.duplicate_instances(
+                instances, luxcore_scene, stats
+            )
         # The instances dict can be quite large, delete explicitely (TODO maybe
         # even call gc.collect()?)
         del instances
@@ -224,7 +291,8 @@ class Exporter(object):
 
         # Convert config at last because all lightgroups and passes have to be
         # already defined
-        config_props = config.convert(self, scene, context, engine)
+        with profiler.span("Config"):
+            config_props = config.convert(self, scene, context, engine)
         if str(config_props) == "":
             # Config props are empty: there was a critical error in config
             # export, we can't render
@@ -235,6 +303,7 @@ class Exporter(object):
         self.config_cache.diff(str(config_props))
 
         # Imagepipeline
+        self.imagepipeline_edit_count = imagepipeline_settings.edit_count
         imagepipeline_props = imagepipeline.convert(scene, context)
         self.imagepipeline_cache.diff(
             imagepipeline_props
@@ -243,6 +312,7 @@ class Exporter(object):
         config_props.Set(imagepipeline_props)
 
         # Halt conditions
+        self.halt_edit_count = halt_settings.edit_count
         halt_props = halt.convert(scene)
         self.halt_cache.diff(halt_props)
         config_props.Set(halt_props)
@@ -267,7 +337,8 @@ class Exporter(object):
             print("DEBUG: Config Properties:\n")
             print(config_props)
             print("-" * 50)
-        renderconfig = pyluxcore.RenderConfig(config_props, luxcore_scene)
+        with profiler.span("RenderConfig"):
+            renderconfig = pyluxcore.RenderConfig(config_props, luxcore_scene)
 
         # Regularly check if we should abort the export (important in heavy
         # scenes)
@@ -279,6 +350,8 @@ class Exporter(object):
         if stats:
             stats.export_time.value = export_time
             self._init_stats(stats, config_props, scene)
+            if profiler.enabled:
+                stats.slowest_objects.value = profiler.get_slowest_objects()
 
         # Pre-compile CUDA or OpenCL kernels for viewport and final.
         renderengine_type = config_props.Get("renderengine.type").GetString()
@@ -363,12 +436,51 @@ class Exporter(object):
 
         # Do not hold reference to temporary data
         self.scene = None
-        return pyluxcore.RenderSession(renderconfig)
+        with profiler.span("RenderSession"):
+            return pyluxcore.RenderSession(renderconfig)
+
+    def write_profile(self, scene):
+        """Write the export trace next to the render output, if the export was profiled"""
+        if not self.profiler.enabled:
+            return
+
+        output_dir = os.path.dirname(bpy.path.abspath(scene.render.filepath))
+        if not output_dir:
+            # The output path is only a file name prefix, or the .blend is not saved
+            output_dir = bpy.path.abspath("//") or tempfile.gettempdir()
+        filepath = os.path.join(
+            output_dir, "luxcore_export_trace_%04d.json" % scene.frame_current
+        )
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            self.profiler.write(filepath)
+            print('[Exporter] Export trace written to "%s"' % filepath)
+        except OSError as error:
+            LuxCoreErrorLog.add_warning(
+                f'Could not write export trace "{filepath}": {error}'
+            )
 
-    def get_viewport_changes(self, depsgraph, context=None):
+    def get_viewport_changes(self, depsgraph, context=None, only_if_view_changed=False):
+        """
+        only_if_view_changed: Skip the conversion of config and camera if the view and
+        the viewport settings are the same as in the last call (used on every redraw)
+        """
         self.scene = depsgraph.scene_eval
         changes = Change.NONE
 
+        if only_if_view_changed:
+            if not self.viewport_cache.diff(self.scene, context):
+                self.scene = None
+                return changes
+
+            if self.scene.luxcore.debug.enabled:
+                print(
+                    f"[Exporter] Viewport redraws: {self.viewport_cache.checks}, "
+                    f"conversions: {self.viewport_cache.conversions}"
+                )
+        else:
+            self.viewport_cache.update(self.scene, context)
+
         config_props = config.convert(self, self.scene, context)
         if self.config_cache.diff(config_props):
             changes |= Change.CONFIG
@@ -394,10 +506,14 @@ class Exporter(object):
             if self.object_cache2.diff(depsgraph):
                 changes |= Change.OBJECT
 
-            if self.material_cache.diff(depsgraph):
+            if self.material_cache.diff(depsgraph, self.converted_materials):
                 changes |= Change.MATERIAL
 
-            if self.visibility_cache.diff(depsgraph, context):
+            if depsgraph.id_type_updated("NODETREE") or changes & Change.MATERIAL:
+                # Node trees can point to each other, so all entries might be affected
+                self.node_tree_features.clear()
+
+            if self.visibility_cache.diff(depsgraph, context, self.object_cache2):
                 changes |= Change.VISIBILITY
 
                 if self.visibility_cache.has_new_objects:
@@ -409,13 +525,17 @@ class Exporter(object):
         if changes is None:
             changes = Change.NONE
 
-        # Relevant during final render
-        imagepipeline_props = imagepipeline.convert(depsgraph.scene, context)
-        if self.imagepipeline_cache.diff(imagepipeline_props):
-            changes |= Change.IMAGEPIPELINE
-
-        if final:
-            # Halt conditions are only used during final render
+        # Relevant during final render. There, this method is called several times per
+        # second, so the settings are only converted and compared after they were edited.
+        if not final or self.imagepipeline_edit_count != imagepipeline_settings.edit_count:
+            self.imagepipeline_edit_count = imagepipeline_settings.edit_count
+            imagepipeline_props = imagepipeline.convert(depsgraph.scene, context)
+            if self.imagepipeline_cache.diff(imagepipeline_props):
+                changes |= Change.IMAGEPIPELINE
+
+        # Halt conditions are only used during final render
+        if final and self.halt_edit_count != halt_settings.edit_count:
+            self.halt_edit_count = halt_settings.edit_count
             halt_props = halt.convert(depsgraph.scene)
             if self.halt_cache.diff(halt_props):
                 changes |= Change.HALT
@@ -449,6 +569,8 @@ class Exporter(object):
                 import traceback
 
                 traceback.print_exc()
+            finally:
+                smoke.free_buffers()
 
             try:
                 session.EndSceneEdit()
@@ -496,6 +618,8 @@ class Exporter(object):
 
     def _update_scene(self, depsgraph, context, changes, luxcore_scene):
         props = pyluxcore.Properties()
+        # Latency of the individual change types, in seconds
+        timings = {}
 
         if changes & Change.CAMERA:
             # We already converted the new camera settings during
@@ -503,31 +627,31 @@ class Exporter(object):
             props.Set(self.camera_cache.props)
 
         if changes & Change.OBJECT:
+            start = time()
             self.object_cache2.update(
-                self, depsgraph, luxcore_scene, props, context
+                self,
+                depsgraph,
+                luxcore_scene,
+                props,
+                context,
+                self.visibility_cache.added_objects,
             )
+            timings["OBJECT"] = time() - start
 
         if changes & Change.MATERIAL:
+            start = time()
             self.material_cache.update(self, depsgraph, context, props)
+            timings["MATERIAL"] = time() - start
 
         if changes & Change.VISIBILITY:
-            for key in self.visibility_cache.objects_to_remove:
-                print("Removing object with key", key)
-
-                try:
-                    exported_obj = self.object_cache2.exported_objects.pop(key)
-                    exported_obj.delete(luxcore_scene)
-                except KeyError:
-                    # This is ok, not every exportable object is added to exported_objects
-                    pass
-
-            if self.visibility_cache.objects_to_remove:
-                # luxcore_scene.RemoveUnusedMeshes()  # TODO for some reason this deletes even some meshes that are still in use
-                luxcore_scene.RemoveUnusedMaterials()
-                luxcore_scene.RemoveUnusedTextures()
-                luxcore_scene.RemoveUnusedImageMaps()
+            start = time()
+            self.object_cache2.delete_objects(
+                self.visibility_cache.objects_to_remove, luxcore_scene
+            )
+            timings["VISIBILITY"] = time() - start
 
         if changes & Change.WORLD:
+            start = time()
             if (
                 not context.scene.world
                 or context.scene.world.luxcore.light == "none"
@@ -538,7 +662,17 @@ class Exporter(object):
                 self, depsgraph, context.scene, is_viewport_render=True
             )
             props.Set(world_props)
+            timings["WORLD"] = time() - start
 
+        # Printed on every interactive edit, so only in debug mode
+        if timings and context.scene.luxcore.debug.enabled:
+            print(
+                "[Exporter] Update latency:",
+                ", ".join(
+                    f"{change} {duration * 1000:.1f} ms"
+                    for change, duration in timings.items()
+                ),
+            )
         return props
 
     def _init_stats(self, stats, config_props, scene):
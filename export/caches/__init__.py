@@ -24,6 +24,79 @@ class StringCache:
         return has_changes
 
 
+class ViewportCache:
+    """
+    Detects changes of the view (e.g. while orbiting) without converting the
+    viewport config and camera to pyluxcore.Properties on every redraw.
+    Only the inputs that can change without a depsgraph update are fingerprinted,
+    plus the config settings that are read for the viewport. Everything else is
+    handled by view_update(), which always converts.
+    """
+    def __init__(self):
+        self.fingerprint = None
+        # Debug counters: redraws vs. redraws that needed a conversion
+        self.checks = 0
+        self.conversions = 0
+
+    def diff(self, scene, context):
+        self.checks += 1
+        fingerprint = _get_viewport_fingerprint(scene, context)
+        if fingerprint == self.fingerprint:
+            return False
+        self.fingerprint = fingerprint
+        self.conversions += 1
+        return True
+
+    def update(self, scene, context):
+        """Store the fingerprint after a conversion that happened without diff()"""
+        self.fingerprint = _get_viewport_fingerprint(scene, context)
+
+
+def _get_viewport_fingerprint(scene, context):
+    region_data = context.region_data
+    space = context.space_data
+    viewport = scene.luxcore.viewport
+    config = scene.luxcore.config
+    render = scene.render
+    camera = scene.camera
+
+    return (
+        context.region.width,
+        context.region.height,
+        region_data.view_perspective,
+        region_data.view_matrix.copy(),
+        region_data.view_distance,
+        region_data.view_camera_zoom,
+        tuple(region_data.view_camera_offset),
+        space.lens,
+        space.clip_start,
+        space.clip_end,
+        space.shading.type,
+        space.use_render_border,
+        space.render_border_min_x,
+        space.render_border_max_x,
+        space.render_border_min_y,
+        space.render_border_max_y,
+        camera.matrix_world.copy() if camera else None,
+        render.use_border,
+        render.threads_mode,
+        render.threads,
+        viewport.device,
+        viewport.use_denoiser,
+        viewport.reduce_resolution_on_edit,
+        viewport.resolution_reduction,
+        config.filter_enabled,
+        config.filter,
+        config.filter_width,
+        config.light_strategy,
+        config.min_epsilon,
+        config.max_epsilon,
+        config.path.use_clamping,
+        config.path.clamping,
+        utils.get_addon_preferences(bpy.context).film_device,
+    )
+
+
 class CameraCache:
     def __init__(self):
         self.string_cache = StringCache()
@@ -50,12 +123,23 @@ class MaterialCache:
     def __init__(self):
         self.changed_materials = set()
 
-    def diff(self, depsgraph):
+    def diff(self, depsgraph, converted_materials):
+        """
+        converted_materials is the Exporter's cache of material.convert() results,
+        the entries of changed materials are removed from it
+        """
         if depsgraph.id_type_updated("MATERIAL"):
             for dg_update in depsgraph.updates:
                 if isinstance(dg_update.id, bpy.types.Material):
                     self.changed_materials.add(dg_update.id)
                     print("mat update:", dg_update.id.name)
+                    pointer = dg_update.id.original.as_pointer()
+                    converted_materials.pop((pointer, True), None)
+                    converted_materials.pop((pointer, False), None)
+
+        if depsgraph.id_type_updated("NODETREE"):
+            # Node trees can be shared between materials through pointer nodes
+            converted_materials.clear()
         return self.changed_materials
 
     def update(self, exporter, depsgraph, is_viewport_render, props):
@@ -66,9 +150,18 @@ class MaterialCache:
 
 
 class VisibilityCache:
+    """
+    Tracks the visibility of the objects in the view layer instead of every instance,
+    so no loop over depsgraph.object_instances is needed. The exported instances of
+    hidden objects are looked up in the index of the ObjectCache2, instances that
+    disappear from objects that are still visible (e.g. particles) are removed
+    by ObjectCache2.update()
+    """
     def __init__(self):
-        # sets containing keys
+        # sets containing session_uids of objects (instancers in case of duplis)
         self.last_visible_objects = None
+        self.added_objects = set()
+        # keys of exported objects
         self.objects_to_remove = None
         
         self.has_new_objects = False
@@ -76,27 +169,22 @@ class VisibilityCache:
     def init(self, depsgraph, context):
         self.last_visible_objects = self._get_visible_objects(depsgraph, context)
 
-    def diff(self, depsgraph, context):
+    def diff(self, depsgraph, context, object_cache):
         visible_objs = self._get_visible_objects(depsgraph, context)
-        self.objects_to_remove = self.last_visible_objects - visible_objs
-        self.has_new_objects = bool(visible_objs - self.last_visible_objects)
+        hidden_objs = self.last_visible_objects - visible_objs
+        self.objects_to_remove = [key for uid in hidden_objs for key in object_cache.get_instance_keys(uid)]
+        self.added_objects = visible_objs - self.last_visible_objects
+        self.has_new_objects = bool(self.added_objects)
         self.last_visible_objects = visible_objs
         return bool(self.objects_to_remove) or self.has_new_objects
 
     def _get_visible_objects(self, depsgraph, context):
-        keys = set()
-
-        for dg_obj_instance in depsgraph.object_instances:
-            if not supports_live_transform(dg_obj_instance.particle_system):
-                continue
-
-            if dg_obj_instance.show_self:
-                # For duplis, check visibility of parent (emitter)
-                obj = dg_obj_instance.parent if dg_obj_instance.parent else dg_obj_instance.object
-                if obj.luxcore.exclude_from_render or not obj.visible_in_viewport_get(context.space_data):
-                    continue
-                keys.add(utils.make_key_from_instance(dg_obj_instance))
-        return keys
+        view_layer = depsgraph.view_layer
+        return {
+            obj.session_uid for obj in view_layer.objects
+            if not obj.luxcore.exclude_from_render
+            and obj.visible_get(view_layer=view_layer, viewport=context.space_data)
+        }
 
 
 class WorldCache:
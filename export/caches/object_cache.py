@@ -1,7 +1,9 @@
 import bpy
 from array import array
+from contextlib import nullcontext
 from functools import lru_cache
 from time import time
+import numpy as np
 
 from ... import utils
 import pyluxcore
@@ -30,55 +32,15 @@ class TriAOVDataIndices:
 MAX_PARTICLES_FOR_LIVE_TRANSFORM = 2000
 
 
-def uses_pointiness(node_tree):
-    # TODO better check would be if the node is linked to the output and actually used
-    return utils_node.has_nodes(node_tree, "LuxCoreNodeTexPointiness", True)
-
-
-def uses_random_per_island_uniform_float(node_tree):
-    # TODO better check would be if the node is linked to the output and actually used
-    return utils_node.has_nodes(
-        node_tree, "LuxCoreNodeTexRandomPerIsland", True
-    )
-
-
-def uses_random_per_island_int(node_tree):
-    # TODO better check would be if the node is linked to the output and actually used
-    for node in utils_node.find_nodes_multi(
-        node_tree, {"LuxCoreNodeTexMapping2D", "LuxCoreNodeTexMapping3D"}, True
-    ):
-        if (
-            node.mapping_type in {"uvrandommapping2d", "localrandommapping3d"}
-            and node.seed_type == "mesh_islands"
-        ):
-            return True
-    return False
-
-
-def needs_edge_detector_shape(node_tree):
-    # TODO better check would be if the node is linked to the output and actually used
-    for node in utils_node.find_nodes(
-        node_tree, "LuxCoreNodeTexWireframe", True
-    ):
-        if node.hide_planar_edges:
-            return True
-    return False
-
-
-def uses_displacement(obj):
+def uses_displacement(obj, feature_cache=None):
     for mat_slot in obj.material_slots:
         mat = mat_slot.material
         if (
             mat
             and mat.luxcore.node_tree
-            and utils_node.has_nodes_multi(
-                mat.luxcore.node_tree,
-                {
-                    "LuxCoreNodeShapeHeightDisplacement",
-                    "LuxCoreNodeShapeVectorDisplacement",
-                },
-                True,
-            )
+            and utils_node.get_node_tree_features(
+                mat.luxcore.node_tree, feature_cache
+            ).uses_displacement
         ):
             return True
     return False
@@ -95,8 +57,11 @@ def define_shapes(input_shape, node_tree, exporter, depsgraph, scene_props):
         )
 
     # Add some shapes at the end that are required by some nodes in the node tree
+    features = utils_node.get_node_tree_features(
+        node_tree, exporter.node_tree_features
+    )
 
-    if uses_pointiness(node_tree):
+    if features.uses_pointiness:
         # Note: Since Blender still does not make use of the vertex alpha channel
         # as of 2.82, we use it to store the pointiness information.
         pointiness_shape = input_shape + "_pointiness"
@@ -106,9 +71,9 @@ def define_shapes(input_shape, node_tree, exporter, depsgraph, scene_props):
         shape = pointiness_shape
 
     _uses_random_per_island_uniform_float = (
-        uses_random_per_island_uniform_float(node_tree)
+        features.uses_random_per_island_uniform_float
     )
-    _uses_random_per_island_int = uses_random_per_island_int(node_tree)
+    _uses_random_per_island_int = features.uses_random_per_island_int
     if _uses_random_per_island_uniform_float or _uses_random_per_island_int:
         island_aov_index = TriAOVDataIndices.RANDOM_PER_ISLAND_INT
 
@@ -144,7 +109,7 @@ def define_shapes(input_shape, node_tree, exporter, depsgraph, scene_props):
             )
             shape = random_tri_aov_shape
 
-    if needs_edge_detector_shape(node_tree):
+    if features.needs_edge_detector_shape:
         edge_detector_shape = input_shape + "_edge_detector"
         prefix = "scene.shapes." + edge_detector_shape + "."
         scene_props.Set(pyluxcore.Property(prefix + "type", "edgedetectoraov"))
@@ -216,11 +181,26 @@ def export_material(
         # Blender gives us "NodeTreeUndefined" as mat.node_tree.bl_idname
         mat = mat.original
 
-        lux_mat_name, mat_props = material.convert(
-            exporter, depsgraph, mat, is_viewport_render, obj.name
-        )
+        # A material shared by many objects only has its node tree walked once,
+        # and its props are only returned the first time (mat_props is None afterwards).
+        # mat is already the result of the view layer override resolution.
+        key = (mat.as_pointer(), is_viewport_render)
         node_tree = mat.luxcore.node_tree
-        return lux_mat_name, mat_props, node_tree
+        try:
+            lux_mat_name, warnings = exporter.converted_materials[key]
+        except KeyError:
+            with exporter.profiler.span("Material", mat.name), LuxCoreErrorLog.record(
+                obj.name
+            ) as warnings:
+                lux_mat_name, mat_props = material.convert(
+                    exporter, depsgraph, mat, is_viewport_render, obj.name
+                )
+            exporter.converted_materials[key] = (lux_mat_name, warnings)
+            return lux_mat_name, mat_props, node_tree
+
+        # The other objects using a broken material are listed in the error log, too
+        LuxCoreErrorLog.replay(warnings, obj.name)
+        return lux_mat_name, None, node_tree
     else:
         lux_mat_name, mat_props = material.fallback()
         return lux_mat_name, mat_props, None
@@ -288,21 +268,86 @@ def get_obj_count_estimate(depsgraph):
     return obj_count
 
 
+# Markers for instanced objects in the dupli loop of _convert_all_objects()
+_UNSEEN = object()
+_NOT_DUPLICATED = object()
+
+
 class Duplis:
-    def __init__(self, exported_obj):
+    def __init__(self, exported_obj, obj_id=-1):
         self.exported_obj = exported_obj
+        # The LuxCore object ID set by the user, -1 if a random ID should be used per instance
+        self.obj_id = obj_id
         self.matrices = array("f", [])
         self.object_ids = array("I", [])
+        # Instances that were already handed to LuxCore in earlier chunks
+        self.duplicated_count = 0
+        self.chunk_index = 0
+        # One array of matrices per motion blur step, filled by motion_blur.convert()
+        self.step_matrices = []
+        # (steps, times, transformations) for DuplicateObject, None if the duplis don't move
+        self.motion = None
 
     def get_count(self):
         return len(self.object_ids)
 
+    def clear(self):
+        # In-place, the dupli loop in first_run() holds references to the bound append/extend methods
+        del self.matrices[:]
+        del self.object_ids[:]
+
+    def set_step_matrices(self, step, matrices):
+        """matrices: array of flattened matrices in the same order as self.matrices"""
+        while len(self.step_matrices) <= step:
+            self.step_matrices.append(None)
+        self.step_matrices[step] = matrices
+
+    def finish_motion(self, times):
+        """
+        Convert the collected step matrices into the instance-major layout expected by
+        DuplicateObject (all steps of the first instance, then all steps of the second etc.)
+        """
+        step_matrices = self.step_matrices
+        self.step_matrices = []
+        self.motion = None
+
+        steps = len(times)
+        count = self.get_count()
+        if count == 0 or len(step_matrices) != steps:
+            return
+        if any(matrices is None or len(matrices) != count * 16 for matrices in step_matrices):
+            # The instances changed during the shutter time (e.g. particles were born or died),
+            # so we can't tell which matrices belong together
+            print(f"[Motion Blur] Instance count changes during the shutter time, "
+                  f"exporting {count} duplis without motion blur")
+            return
+
+        transformations = np.stack(
+            [np.frombuffer(matrices, dtype=np.float32).reshape(count, 16) for matrices in step_matrices],
+            axis=1,
+        )
+        if (transformations == transformations[:, :1]).all():
+            # Not moving
+            return
+
+        times = np.tile(np.asarray(times, dtype=np.float32), count)
+        self.motion = (steps, times, transformations.ravel())
+
 
 class ObjectCache2:
     def __init__(self):
         self.exported_objects = {}
         self.exported_meshes = {}
         self.exported_hair = {}
+        # Only set during first_run()
+        self._mesh_pipeline = None
+        # Time spent collecting dupli matrices in the last first_run()
+        self._dupli_collection_time = 0
+        # Keys of exported_objects grouped by the session_uid of the object they belong
+        # to (the instancer in case of duplis), so viewport updates only have to look
+        # at the instances of the objects that actually changed
+        self.instance_keys = {}
+        self._key_owners = {}
 
     def first_run(
         self,
@@ -313,10 +358,53 @@ class ObjectCache2:
         luxcore_scene,
         scene_props,
         context,
+    ):
+        # Meshes are extracted from Blender on this thread, while their
+        # post-processing and definition in LuxCore overlaps with the
+        # extraction of the next objects
+        self._mesh_pipeline = mesh_converter.DefinePipeline()
+        try:
+            instances = self._convert_all_objects(
+                exporter,
+                depsgraph,
+                view_layer,
+                engine,
+                luxcore_scene,
+                scene_props,
+                context,
+            )
+            if instances is not None:
+                # All shapes have to be defined before scene_props are parsed
+                start_time = time()
+                self._mesh_pipeline.wait()
+                if exporter.stats:
+                    exporter.stats.export_time_meshes.value += time() - start_time
+            return instances
+        finally:
+            self._mesh_pipeline.shutdown()
+            self._mesh_pipeline = None
+
+    def _convert_all_objects(
+        self,
+        exporter,
+        depsgraph,
+        view_layer,
+        engine,
+        luxcore_scene,
+        scene_props,
+        context,
     ):
         is_viewport_render = bool(context)
         instances = {}
 
+        # Number of instances per object after which they are handed to LuxCore while
+        # the export is still running, 0 to duplicate all of them at the end
+        scene = depsgraph.scene_eval
+        chunk_size = scene.luxcore.config.instancing_chunk_size
+        if exporter.motion_blur_enabled and scene.camera.data.luxcore.motion_blur.object_blur:
+            # The matrices of all motion blur steps are needed before the duplis can be defined
+            chunk_size = 0
+
         if engine:
             obj_count_estimate = max(1, get_obj_count_estimate(depsgraph))
         else:
@@ -325,91 +413,116 @@ class ObjectCache2:
         # Particle system counts might have changed
         supports_live_transform.cache_clear()
 
+        # Everything the dupli loop needs per instanced object, looked up only once per object:
+        # session_uid -> (object ID, object_ids.append, matrices.extend), None if the object
+        # could not be exported or _NOT_DUPLICATED if it is not a mesh object.
+        # The keys of instances are session_uids as well.
+        dupli_targets = {}
+        matrix_to_list = pyluxcore.BlenderMatrix4x4ToList
+        loop_start = time()
+        convert_time = 0
+
         for index, dg_obj_instance in enumerate(depsgraph.object_instances):
             obj = dg_obj_instance.object
 
-            if (
-                dg_obj_instance.is_instance
-                and not (
-                    is_viewport_render
-                    and supports_live_transform(
-                        dg_obj_instance.particle_system
-                    )
-                )
-                and obj.type in MESH_OBJECTS
+            if dg_obj_instance.is_instance and not (
+                is_viewport_render
+                and supports_live_transform(dg_obj_instance.particle_system)
             ):
                 # This code is optimized for large amounts of duplis. Drawback is that objects generated from this
                 # code can't be transformed later in a viewport render session (due to BlendLuxCore implementation
                 # reasons, not because of LuxCore)
-                if engine and index % 5000 == 0:
-                    if engine.test_break():
-                        return None
-                    _update_stats(
-                        engine, obj.name, " (dupli)", index, obj_count_estimate
-                    )
+                session_uid = obj.session_uid
+                target = dupli_targets.get(session_uid, _UNSEEN)
 
-                try:
-                    # The code in this try block is performance-critical, as it is
+                if type(target) is tuple:
+                    # The code in this block is performance-critical, as it is
                     # executed most often when exporting millions of instances.
-                    duplis = instances[obj.original.as_pointer()]
-                    # If duplis is None, then a non-exportable object like a curve with zero faces is being duplicated
-                    if duplis:
-                        obj_id = dg_obj_instance.object.original.luxcore.id
-                        if obj_id == -1:
-                            obj_id = dg_obj_instance.random_id & 0xFFFFFFFE
-                        duplis.object_ids.append(obj_id)
-                        # We need a copy of matrix_world here, not sure why, but if we don't
-                        # make a copy, we only get an identity matrix in C++
-                        duplis.matrices.extend(
-                            pyluxcore.BlenderMatrix4x4ToList(
-                                dg_obj_instance.matrix_world.copy()
+                    if index % 5000 == 0:
+                        if engine:
+                            if engine.test_break():
+                                return None
+                            _update_stats(
+                                engine, obj.name, " (dupli)", index, obj_count_estimate
                             )
-                        )
-                except KeyError:
-                    if engine:
-                        if engine.test_break():
-                            return None
-                        _update_stats(
-                            engine,
-                            obj.name,
-                            " (dupli)",
-                            index,
-                            obj_count_estimate,
-                        )
-                    exported_obj = self._convert_obj(
-                        exporter,
-                        dg_obj_instance,
-                        obj,
-                        depsgraph,
-                        luxcore_scene,
-                        scene_props,
-                        is_viewport_render,
-                        view_layer,
-                        engine,
-                    )
-                    if exported_obj:
-                        # Note, the transformation matrix and object ID of this first instance is not added
-                        # to the duplication list, since it already exists in the scene
-                        instances[obj.original.as_pointer()] = Duplis(
-                            exported_obj
-                        )
-                    else:
-                        # Could not export the object, happens e.g. with curve objects with zero faces
-                        instances[obj.original.as_pointer()] = None
-            else:
-                # This code is for singular objects and for duplis that should be movable later in a viewport render
-                if not utils.is_instance_visible(
-                    dg_obj_instance, obj, context
-                ):
+                        if chunk_size:
+                            self._stream_duplis(instances, luxcore_scene, scene_props, chunk_size)
+
+                    obj_id, append_id, extend_matrices = target
+                    if obj_id == -1:
+                        obj_id = dg_obj_instance.random_id & 0xFFFFFFFE
+                    append_id(obj_id)
+                    # We need a copy of matrix_world here, not sure why, but if we don't
+                    # make a copy, we only get an identity matrix in C++
+                    extend_matrices(matrix_to_list(dg_obj_instance.matrix_world.copy()))
                     continue
 
-                if engine:
-                    if engine.test_break():
-                        return None
-                    _update_stats(
-                        engine, obj.name, "", index, obj_count_estimate
-                    )
+                if target is _UNSEEN:
+                    if obj.type in MESH_OBJECTS:
+                        if engine:
+                            if engine.test_break():
+                                return None
+                            _update_stats(
+                                engine,
+                                obj.name,
+                                " (dupli)",
+                                index,
+                                obj_count_estimate,
+                            )
+                        convert_start = time()
+                        with exporter.profiler.object_span(obj.name):
+                            exported_obj = self._convert_obj(
+                                exporter,
+                                dg_obj_instance,
+                                obj,
+                                depsgraph,
+                                luxcore_scene,
+                                scene_props,
+                                is_viewport_render,
+                                view_layer,
+                                engine,
+                            )
+                        convert_time += time() - convert_start
+
+                        if exported_obj:
+                            # Note, the transformation matrix and object ID of this first instance is not added
+                            # to the duplication list, since it already exists in the scene
+                            duplis = Duplis(exported_obj, obj.original.luxcore.id)
+                            instances[session_uid] = duplis
+                            dupli_targets[session_uid] = (
+                                duplis.obj_id,
+                                duplis.object_ids.append,
+                                duplis.matrices.extend,
+                            )
+                        else:
+                            # Could not export the object, happens e.g. with curve objects with zero faces
+                            instances[session_uid] = None
+                            dupli_targets[session_uid] = None
+                        continue
+
+                    # Instances of other object types are exported like singular objects
+                    target = dupli_targets[session_uid] = _NOT_DUPLICATED
+
+                if target is None:
+                    # A non-exportable object like a curve with zero faces is being duplicated
+                    continue
+
+            # This code is for singular objects, for instances of non-mesh objects and
+            # for duplis that should be movable later in a viewport render
+            if not utils.is_instance_visible(
+                dg_obj_instance, obj, context
+            ):
+                continue
+
+            if engine:
+                if engine.test_break():
+                    return None
+                _update_stats(
+                    engine, obj.name, "", index, obj_count_estimate
+                )
 
+            convert_start = time()
+            with exporter.profiler.object_span(obj.name):
                 self._convert_obj(
                     exporter,
                     dg_obj_instance,
@@ -421,7 +534,9 @@ class ObjectCache2:
                     view_layer,
                     engine,
                 )
+            convert_time += time() - convert_start
 
+        self._dupli_collection_time = time() - loop_start - convert_time
         # self._debug_info()
         return instances
 
@@ -431,34 +546,119 @@ class ObjectCache2:
         objects are available for luxcore_scene. Needs to happen before this method is called.
         """
         start_time = time()
+        instance_count = 0
 
         for duplis in instances.values():
             if duplis is None:
                 # If duplis is None, then a non-exportable object like a curve with zero faces is being duplicated
                 continue
 
-            if duplis.get_count() == 0:
-                # Only one instance was created (and is already present in the luxcore_scene), nothing to duplicate
-                continue
+            if duplis.get_count() > 0:
+                self._duplicate(duplis, luxcore_scene)
+            # If no instances are left, only one instance was created (and is already present
+            # in the luxcore_scene) or all were already duplicated in chunks during first_run()
+            instance_count += duplis.duplicated_count
 
-            for part in duplis.exported_obj.parts:
-                src_name = part.lux_obj
-                dst_name = src_name + "dupli"
-                luxcore_scene.DuplicateObject(
-                    src_name,
-                    dst_name,
-                    duplis.get_count(),
-                    duplis.matrices,
-                    duplis.object_ids,
-                )
+        if stats:
+            # Includes the collection of the dupli matrices in first_run()
+            instancing_time = time() - start_time + self._dupli_collection_time
+            stats.export_time_instancing.value = instancing_time
+            if instancing_time > 0:
+                stats.instances_per_sec.value = instance_count / instancing_time
 
-                # TODO: support steps and times (motion blur)
-                # steps = 0 # TODO
-                # times = array("f", [])
-                # luxcore_scene.DuplicateObject(src_name, dst_name, count, steps, times, transformations)
+    def _stream_duplis(self, instances, luxcore_scene, scene_props, chunk_size):
+        """
+        Hand the instances of all objects that collected at least chunk_size of them to LuxCore
+        and release their matrices, so the memory usage stays bounded regardless of instance count
+        """
+        full_duplis = [
+            duplis for duplis in instances.values()
+            if duplis and duplis.get_count() >= chunk_size
+        ]
+        if not full_duplis:
+            return
+
+        if scene_props.GetSize() > 0:
+            # The base objects (and their shapes and materials) have to exist in the luxcore_scene
+            self._mesh_pipeline.wait()
+            with self._scene_lock():
+                luxcore_scene.Parse(scene_props)
+            scene_props.Clear()
+
+        for duplis in full_duplis:
+            self._duplicate(duplis, luxcore_scene)
+
+    def _duplicate(self, duplis, luxcore_scene):
+        count = duplis.get_count()
+
+        for part in duplis.exported_obj.parts:
+            src_name = part.lux_obj
+            dst_name = src_name + "dupli"
+            if duplis.chunk_index:
+                # LuxCore appends the instance index to the name, so each chunk needs its own prefix
+                dst_name += "%d_" % duplis.chunk_index
+
+            with self._scene_lock():
+                if duplis.motion:
+                    steps, times, transformations = duplis.motion
+                    luxcore_scene.DuplicateObject(
+                        src_name,
+                        dst_name,
+                        count,
+                        steps,
+                        times,
+                        transformations,
+                        duplis.object_ids,
+                    )
+                else:
+                    luxcore_scene.DuplicateObject(
+                        src_name,
+                        dst_name,
+                        count,
+                        duplis.matrices,
+                        duplis.object_ids,
+                    )
 
-        if stats:
-            stats.export_time_instancing.value = time() - start_time
+        duplis.duplicated_count += count
+        duplis.chunk_index += 1
+        duplis.clear()
+
+    def get_instance_keys(self, owner_uid):
+        return self.instance_keys.get(owner_uid, ())
+
+    def delete_objects(self, obj_keys, luxcore_scene):
+        """Delete exported objects from LuxCore, keys of objects that were not exported are ignored"""
+        deleted = False
+
+        for obj_key in obj_keys:
+            print("Removing object with key", obj_key)
+            owner_uid = self._key_owners.pop(obj_key, None)
+            if owner_uid is not None:
+                keys = self.instance_keys[owner_uid]
+                keys.discard(obj_key)
+                if not keys:
+                    del self.instance_keys[owner_uid]
+
+            exported_obj = self.exported_objects.pop(obj_key, None)
+            if exported_obj:
+                exported_obj.delete(luxcore_scene)
+                deleted = True
+
+        if deleted:
+            # luxcore_scene.RemoveUnusedMeshes()  # TODO for some reason this deletes even some meshes that are still in use
+            luxcore_scene.RemoveUnusedMaterials()
+            luxcore_scene.RemoveUnusedTextures()
+            luxcore_scene.RemoveUnusedImageMaps()
+
+    def _index_key(self, owner_uid, obj_key):
+        self.instance_keys.setdefault(owner_uid, set()).add(obj_key)
+        self._key_owners[obj_key] = owner_uid
+
+    def _scene_lock(self):
+        """Has to be held for every luxcore_scene call while meshes are defined in the background"""
+        if self._mesh_pipeline:
+            return self._mesh_pipeline.scene_lock
+        return nullcontext()
 
     def _debug_info(self):
         print("Objects in cache:", len(self.exported_objects))
@@ -516,14 +716,16 @@ class ObjectCache2:
                         is_for_duplication = (
                             is_viewport_render or dg_obj_instance.is_instance
                         )
-                        lux_shape = convert_hair_curves(
-                            exporter,
-                            depsgraph,
-                            obj,
-                            obj_key,
-                            luxcore_scene,
-                            is_for_duplication,
-                        )
+                        with exporter.profiler.span("Hair", obj.name):
+                            lux_shape = convert_hair_curves(
+                                exporter,
+                                depsgraph,
+                                obj,
+                                obj_key,
+                                luxcore_scene,
+                                is_for_duplication,
+                                self._scene_lock(),
+                            )
                         if lux_shape:
                             mat = obj.data.materials[0]
                             if mat:
@@ -542,7 +744,8 @@ class ObjectCache2:
                             lux_mat, mat_props, node_tree = export_material(
                                 obj, 0, exporter, depsgraph, is_viewport_render
                             )
-                            scene_props.Set(mat_props)
+                            if mat_props is not None:
+                                scene_props.Set(mat_props)
                             set_hair_props(
                                 scene_props,
                                 lux_shape,
@@ -586,6 +789,7 @@ class ObjectCache2:
                     luxcore_scene,
                     dg_obj_instance.matrix_world.copy(),
                     is_viewport_render,
+                    self._scene_lock(),
                 )
 
         # Convert hair
@@ -612,20 +816,24 @@ class ObjectCache2:
                 try:
                     lux_shape = self.exported_hair[psys_key]
                 except KeyError:
-                    lux_shape = convert_hair(
-                        exporter,
-                        obj,
-                        obj_key,
-                        psys,
-                        depsgraph,
-                        luxcore_scene,
-                        scene_props,
-                        is_viewport_render,
-                        is_for_duplication,
-                        dg_obj_instance.matrix_world,
-                        visible_to_cam,
-                        engine,
-                    )
+                    with exporter.profiler.span(
+                        "Hair", obj.name, particle_system=psys.name
+                    ):
+                        lux_shape = convert_hair(
+                            exporter,
+                            obj,
+                            obj_key,
+                            psys,
+                            depsgraph,
+                            luxcore_scene,
+                            scene_props,
+                            is_viewport_render,
+                            is_for_duplication,
+                            dg_obj_instance.matrix_world,
+                            visible_to_cam,
+                            engine,
+                            self._scene_lock(),
+                        )
                     if lux_shape:
                         mat = get_material(obj, mat_index, depsgraph)
                         if mat:
@@ -645,7 +853,8 @@ class ObjectCache2:
                     lux_mat, mat_props, node_tree = export_material(
                         obj, mat_index, exporter, depsgraph, is_viewport_render
                     )
-                    scene_props.Set(mat_props)
+                    if mat_props is not None:
+                        scene_props.Set(mat_props)
                     set_hair_props(
                         scene_props,
                         lux_obj,
@@ -670,6 +879,13 @@ class ObjectCache2:
             scene_props.Set(props)
             self.exported_objects[obj_key] = exported_stuff
 
+            # Duplis of large particle systems are not updated individually in the viewport
+            if not dg_obj_instance.is_instance or supports_live_transform(
+                dg_obj_instance.particle_system
+            ):
+                owner = dg_obj_instance.parent if dg_obj_instance.is_instance else obj
+                self._index_key(owner.session_uid, obj_key)
+
         return exported_stuff
 
     def _convert_mesh_obj(
@@ -694,7 +910,7 @@ class ObjectCache2:
             or (
                 exporter.motion_blur_enabled and obj.luxcore.enable_motion_blur
             )
-            or uses_displacement(obj)
+            or uses_displacement(obj, exporter.node_tree_features)
         )
 
         mesh_key = self._get_mesh_key(obj, use_instancing, is_viewport_render)
@@ -712,6 +928,8 @@ class ObjectCache2:
                 use_instancing,
                 transform,
                 exporter,
+                exporter.mesh_cache,
+                self._mesh_pipeline,
             )
             self.exported_meshes[mesh_key] = exported_mesh
             loaded_from_cache = False
@@ -725,13 +943,16 @@ class ObjectCache2:
                 lux_mat_name, mat_props, node_tree = export_material(
                     obj, mat_index, exporter, depsgraph, is_viewport_render
                 )
-                scene_props.Set(mat_props)
+                if mat_props is not None:
+                    scene_props.Set(mat_props)
                 mat_names.append(lux_mat_name)
 
                 # Meshes in the cache already have the shapes added.
                 # (This assumes that the instances use the same materials as the original mesh)
                 if node_tree and not loaded_from_cache:
-                    warn_about_missing_uvs(obj, node_tree)
+                    warn_about_missing_uvs(
+                        obj, node_tree, exporter.node_tree_features
+                    )
                     shape = define_shapes(
                         shape, node_tree, exporter, depsgraph, scene_props
                     )
@@ -758,11 +979,27 @@ class ObjectCache2:
         )
         return depsgraph.id_type_updated("OBJECT") and not only_scene
 
-    def update(self, exporter, depsgraph, luxcore_scene, scene_props, context):
+    def update(
+        self,
+        exporter,
+        depsgraph,
+        luxcore_scene,
+        scene_props,
+        context,
+        added_objects=(),
+    ):
+        """
+        added_objects: session_uids of objects that became visible since the last update
+        (see VisibilityCache), they are exported even if they are not in depsgraph.updates
+        """
         is_viewport_render = bool(context)
         redefine_objs_with_these_mesh_keys = []
         # Always instance in viewport so we can move objects around
         use_instancing = True
+        updated_uids = self._get_updated_uids(depsgraph, added_objects)
+        # Materials might have been removed from the luxcore_scene with their last object
+        # (see delete_objects()), so their props are passed again once in every update
+        exporter.converted_materials.clear()
 
         # Geometry updates (mesh edit, modifier edit etc.)
         if depsgraph.id_type_updated("OBJECT"):
@@ -773,7 +1010,7 @@ class ObjectCache2:
                     obj = dg_update.id
                     if not utils.is_obj_visible(
                         obj
-                    ) or not obj.visible_in_viewport_get(context.space_data):
+                    ) or not utils.is_visible_in_viewport(obj, context):
                         continue
 
                     if obj.type in MESH_OBJECTS:
@@ -797,6 +1034,7 @@ class ObjectCache2:
                                 is_viewport_render,
                                 use_instancing,
                                 transform,
+                                exporter,
                             )
 
                             if exported_mesh:
@@ -859,23 +1097,37 @@ class ObjectCache2:
                         )
                         if exported_stuff:
                             self.exported_objects[obj_key] = exported_stuff
+                            self._index_key(obj.session_uid, obj_key)
                             scene_props.Set(props)
 
-        # TODO maybe not loop over all instances, instead only loop over updated
-        #  objects and check if they have a particle system that needs to be updated?
-        #  Would be better for performance with many particles, however I'm not sure
-        #  we can find all instances corresponding to one particle system?
+        # Keys of the visible instances of the updated objects
+        seen_keys = set()
 
-        # Currently, every update that doesn't require a mesh re-export happens here
+        # Currently, every update that doesn't require a mesh re-export happens here.
+        # Blender can't list the instances of a single object, so we still have to
+        # iterate over all of them, but everything except the updated objects and the
+        # duplis of updated instancers is skipped after a session_uid lookup.
         for dg_obj_instance in depsgraph.object_instances:
+            obj = dg_obj_instance.object
+
+            if updated_uids is not None and obj.session_uid not in updated_uids:
+                parent = dg_obj_instance.parent
+                if parent is None or parent.session_uid not in updated_uids:
+                    continue
+
             if not supports_live_transform(dg_obj_instance.particle_system):
                 continue
 
-            obj = dg_obj_instance.object
             if not utils.is_instance_visible(dg_obj_instance, obj, context):
                 continue
 
             obj_key = utils.make_key_from_instance(dg_obj_instance)
+            if dg_obj_instance.show_self:
+                seen_keys.add(obj_key)
+            elif obj_key in self.exported_objects:
+                # No longer shown, deleted below together with the other stale instances
+                continue
+
             mesh_key = self._get_mesh_key(obj, use_instancing)
 
             if (
@@ -917,4 +1169,34 @@ class ObjectCache2:
                     is_viewport_render,
                 )
 
+        # Instances of the updated objects that don't exist anymore, e.g. because
+        # a particle system has less particles now or the object was deleted
+        owner_uids = self.instance_keys.keys() if updated_uids is None else updated_uids
+        stale_keys = [
+            key
+            for owner_uid in owner_uids
+            for key in self.get_instance_keys(owner_uid)
+            if key not in seen_keys
+        ]
+        self.delete_objects(stale_keys, luxcore_scene)
+
         # self._debug_info()
+
+    @staticmethod
+    def _get_updated_uids(depsgraph, added_objects):
+        """
+        Returns the session_uids of the updated objects, or None if
+        all instances in the depsgraph have to be checked
+        """
+        updated_uids = set(added_objects)
+
+        for dg_update in depsgraph.updates:
+            update_id = dg_update.id
+            if isinstance(update_id, bpy.types.Collection):
+                # Objects were linked or unlinked, or an instanced collection changed,
+                # which moves duplis of instancers that are not in depsgraph.updates
+                return None
+            if isinstance(update_id, bpy.types.Object):
+                updated_uids.add(update_id.session_uid)
+
+        return updated_uids
@@ -1,3 +1,6 @@
+from contextlib import nullcontext
+from functools import partial
+from itertools import product, repeat, starmap
 from mathutils import Matrix
 import bpy
 import math
@@ -6,6 +9,7 @@ from .. import utils
 from ..utils import node as utils_node
 import pyluxcore
 from .image import ImageExporter
+from .mesh_converter import get_ndarray
 from time import time
 from ..utils.errorlog import LuxCoreErrorLog
 
@@ -56,25 +60,20 @@ def convert_uvs(
             % (obj.name, psys.name, strands_count),
         )
 
-    first_particle = psys.particles[0]
-    f = psys.uv_on_emitter
     uvs = np.fromiter(
-        (
-            elem
-            for i in range(start, dupli_count)
-            for elem in f(
-                mod,
-                particle=(
-                    psys.particles[i] if num_children == 0 else first_particle
-                ),
-                particle_no=i,
-                uv_no=uv_index,
-            )
+        starmap(
+            psys.uv_on_emitter,
+            zip(
+                repeat(mod),
+                _iter_strand_particles(psys, start, dupli_count, num_children),
+                range(start, dupli_count),
+                repeat(uv_index),
+            ),
         ),
-        dtype=np.float32,
-        count=(dupli_count - start) * 2,
+        dtype=(np.float32, 2),
+        count=dupli_count - start,
     )
-    return uvs
+    return uvs.ravel()
 
 
 def convert_colors(
@@ -119,31 +118,36 @@ def convert_colors(
             % (obj.name, psys.name, strands_count),
         )
 
-    first_particle = psys.particles[0]
-    f = psys.mcol_on_emitter
     colors = np.fromiter(
-        (
-            elem
-            for i in range(start, dupli_count)
-            for elem in f(
-                mod,
-                psys.particles[i] if num_children == 0 else first_particle,
-                particle_no=i,
-                vcol_no=vertex_color_index,
-            )
+        starmap(
+            psys.mcol_on_emitter,
+            zip(
+                repeat(mod),
+                _iter_strand_particles(psys, start, dupli_count, num_children),
+                range(start, dupli_count),
+                repeat(vertex_color_index),
+            ),
         ),
-        dtype=np.float32,
-        count=(dupli_count - start) * 3,
+        dtype=(np.float32, 3),
+        count=dupli_count - start,
     )
-    return colors
+    return colors.ravel()
+
+
+def _iter_strand_particles(psys, start, dupli_count, num_children):
+    """The particle argument expected by uv_on_emitter() and mcol_on_emitter() for each strand"""
+    if num_children == 0:
+        return iter(psys.particles[start:dupli_count])
+    else:
+        return repeat(psys.particles[0], dupli_count - start)
 
 
-def warn_about_missing_uvs(obj, node_tree):
+def warn_about_missing_uvs(obj, node_tree, feature_cache=None):
     # TODO once we have a triplanar option for imagemaps, ignore imagemaps with
     #  triplanar in this check because they have no problems with missing UVs
-    has_imagemaps = utils_node.has_nodes(
-        node_tree, "LuxCoreNodeTexImagemap", True
-    )
+    has_imagemaps = utils_node.get_node_tree_features(
+        node_tree, feature_cache
+    ).has_nodes("LuxCoreNodeTexImagemap")
     if has_imagemaps and not utils_node.has_valid_uv_map(obj):
         msg = (
             "Image textures used, but no UVs defined. "
@@ -165,6 +169,7 @@ def convert_hair(
     instance_matrix_world,
     visible_to_camera,
     engine=None,
+    scene_lock=None,
 ):
     try:
         assert psys.settings.render_type == "PATH"
@@ -219,17 +224,17 @@ def convert_hair(
                 "[%s: %s] Preparing %d points"
                 % (obj.name, psys.name, point_count),
             )
-        co_hair = psys.co_hair
+        # Blender has no bulk accessor for (child) hair paths, so we still need
+        # one co_hair() call per point, but the iteration is driven by C-level
+        # iterators and each returned vector is written into the buffer as a whole
         points = np.fromiter(
-            (
-                elem
-                for pindex in range(start, dupli_count)
-                for step in range(points_per_strand)
-                for elem in co_hair(object=obj, particle_no=pindex, step=step)
+            starmap(
+                partial(psys.co_hair, obj),
+                product(range(start, dupli_count), range(points_per_strand)),
             ),
-            dtype=np.float32,
-            count=point_count * 3,
-        )
+            dtype=(np.float32, 3),
+            count=point_count,
+        ).ravel()
 
         colors = np.empty(shape=0, dtype=np.float32)
         uvs = np.empty(shape=0, dtype=np.float32)
@@ -288,9 +293,10 @@ def convert_hair(
         if len(uvs) == 0:
             copy_uvs = False
 
+        collection_time = time() - collection_start
         print(
-            "Collecting Blender hair information took %.3f s"
-            % (time() - collection_start)
+            "Collecting Blender hair information took %.3f s (%d points/s)"
+            % (collection_time, point_count / max(collection_time, 1e-6))
         )
         if engine:
             engine.update_stats(
@@ -310,29 +316,31 @@ def convert_hair(
         else:
             transformation = None
 
-        success = luxcore_scene.DefineBlenderStrands(
-            lux_shape_name,
-            points_per_strand,
-            points,
-            colors,
-            uvs,
-            image_filename,
-            settings.gamma,
-            copy_uvs,
-            transformation,
-            strand_diameter,
-            root_width,
-            tip_width,
-            width_offset,
-            settings.tesseltype,
-            settings.adaptive_maxdepth,
-            settings.adaptive_error,
-            settings.solid_sidecount,
-            settings.solid_capbottom,
-            settings.solid_captop,
-            list(settings.root_color),
-            list(settings.tip_color),
-        )
+        # Only the LuxCore call is locked, so meshes are defined while the strands are extracted
+        with scene_lock or nullcontext():
+            success = luxcore_scene.DefineBlenderStrands(
+                lux_shape_name,
+                points_per_strand,
+                points,
+                colors,
+                uvs,
+                image_filename,
+                settings.gamma,
+                copy_uvs,
+                transformation,
+                strand_diameter,
+                root_width,
+                tip_width,
+                width_offset,
+                settings.tesseltype,
+                settings.adaptive_maxdepth,
+                settings.adaptive_error,
+                settings.solid_sidecount,
+                settings.solid_capbottom,
+                settings.solid_captop,
+                list(settings.root_color),
+                list(settings.tip_color),
+            )
 
         # Sometimes no hair shape could be created, e.g. if the length
         # of all hairs is 0 (can happen e.g. during animations or if hair
@@ -411,28 +419,16 @@ def get_strand_seg(idx, strand):
 
 # Code for Hair Curves in Blender 3.5
 def convert_hair_curves(
-    exporter, depsgraph, obj, obj_key, luxcore_scene, is_for_duplication
+    exporter, depsgraph, obj, obj_key, luxcore_scene, is_for_duplication, scene_lock=None
 ):
     start_time = time()
     lux_shape_name = obj_key
-    time_elapsed = time() - start_time
     scene = depsgraph.scene_eval
 
-    strands = obj.data.curves
-
-    points_per_strand = np.fromiter(
-        (strand.points_length for strand in strands), dtype=np.int32
-    )
-
-    points = np.fromiter(
-        (
-            elem
-            for strand in strands
-            for idx in range(strand.points_length)
-            for elem in strand.points[idx].position
-        ),
-        dtype=np.float32,
-    )
+    try:
+        points_per_strand, points = _get_curves_points_bulk(obj.data)
+    except (AttributeError, KeyError, TypeError, RuntimeError):
+        points_per_strand, points = _get_curves_points_slow(obj.data)
 
     colors = np.empty(shape=0, dtype=np.float32)
     uvs = np.empty(shape=0, dtype=np.float32)
@@ -471,48 +467,95 @@ def convert_hair_curves(
         #                                 strands_count, start, dupli_count, mod, num_children)
 
         if uvs_needed:
-            uvs = np.fromiter(
-                (
-                    elem
-                    for uv_coord in obj.data.attributes[
-                        "surface_uv_coordinate"
-                    ].data
-                    for elem in uv_coord.vector
-                ),
-                dtype=np.float32,
-            )
+            uvs = _get_curves_uvs(obj.data, len(points_per_strand))
 
     if len(uvs) == 0:
         copy_uvs = False
 
     transformation = None
-    success = luxcore_scene.DefineBlenderCurveStrands(
-        lux_shape_name,
-        points_per_strand,
-        points,
-        colors,
-        uvs,
-        image_filename,
-        settings.gamma,
-        copy_uvs,
-        transformation,
-        strand_diameter,
-        root_width,
-        tip_width,
-        width_offset,
-        settings.tesseltype,
-        settings.adaptive_maxdepth,
-        settings.adaptive_error,
-        settings.solid_sidecount,
-        settings.solid_capbottom,
-        settings.solid_captop,
-        list(settings.root_color),
-        list(settings.tip_color),
-    )
+    with scene_lock or nullcontext():
+        success = luxcore_scene.DefineBlenderCurveStrands(
+            lux_shape_name,
+            points_per_strand,
+            points,
+            colors,
+            uvs,
+            image_filename,
+            settings.gamma,
+            copy_uvs,
+            transformation,
+            strand_diameter,
+            root_width,
+            tip_width,
+            width_offset,
+            settings.tesseltype,
+            settings.adaptive_maxdepth,
+            settings.adaptive_error,
+            settings.solid_sidecount,
+            settings.solid_capbottom,
+            settings.solid_captop,
+            list(settings.root_color),
+            list(settings.tip_color),
+        )
 
     if not success:
         return None
 
     if exporter.stats:
-        exporter.stats.export_time_hair.value += time_elapsed
+        exporter.stats.export_time_hair.value += time() - start_time
     return lux_shape_name
+
+
+def _get_curves_points_bulk(curves):
+    """
+    Read the points of a Curves datablock with a few foreach_get calls.
+    Raises AttributeError, KeyError, TypeError or RuntimeError if the required
+    data is not available or has an unexpected layout.
+    """
+    offsets = get_ndarray(curves.curve_offset_data, "value", 0, np.int32)
+    points_per_strand = np.diff(offsets).astype(np.int32)
+    points = get_ndarray(curves.attributes["position"].data, "vector", 3, np.float32)
+    if np.sum(points_per_strand) != len(points):
+        raise RuntimeError("Curve offsets do not match the point count")
+    return points_per_strand, points.ravel()
+
+
+def _get_curves_uvs(curves, curve_count):
+    """
+    Read the surface UV of each curve. Returns an empty array if there is no UV
+    attribute or if it does not contain one UV per curve.
+    """
+    uv_attribute = curves.attributes.get("surface_uv_coordinate")
+    if not uv_attribute or len(uv_attribute.data) != curve_count:
+        return np.empty(shape=0, dtype=np.float32)
+
+    try:
+        uvs = get_ndarray(uv_attribute.data, "vector", 2, np.float32)
+    except (AttributeError, TypeError, RuntimeError):
+        uvs = np.fromiter(
+            (elem for uv_coord in uv_attribute.data for elem in uv_coord.vector),
+            dtype=np.float32,
+        )
+        if len(uvs) != curve_count * 2:
+            return np.empty(shape=0, dtype=np.float32)
+        return uvs
+    return uvs.ravel()
+
+
+def _get_curves_points_slow(curves):
+    strands = curves.curves
+
+    points_per_strand = np.fromiter(
+        (strand.points_length for strand in strands), dtype=np.int32
+    )
+
+    points = np.fromiter(
+        (
+            elem
+            for strand in strands
+            for idx in range(strand.points_length)
+            for elem in strand.points[idx].position
+        ),
+        dtype=np.float32,
+    )
+    return points_per_strand, points
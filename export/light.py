@@ -1,3 +1,4 @@
+from contextlib import nullcontext
 import bpy
 from mathutils import Matrix
 import math
@@ -15,24 +16,28 @@ TYPES_SUPPORTING_ENVLIGHTCACHE = {"sky2", "infinite", "constantinfinite"}
 
 is_blender_5 = bpy.app.version[0] >= 5 # only test of Blender 5 for now
 
-def convert_light(exporter, obj, obj_key, depsgraph, luxcore_scene, transform, is_viewport_render):
+def convert_light(exporter, obj, obj_key, depsgraph, luxcore_scene, transform, is_viewport_render,
+                  scene_lock=None):
+    """scene_lock is held for the luxcore_scene calls, see mesh_converter.DefinePipeline"""
+    scene_lock = scene_lock or nullcontext()
     try:
         luxcore_name = obj_key
         scene = depsgraph.scene_eval
 
-        # If this light was previously defined as an area lamp, delete the area lamp mesh
-        luxcore_scene.DeleteObject(_get_area_obj_name(luxcore_name))
-        # If this light was previously defined as a light, delete it
-        luxcore_scene.DeleteLight(luxcore_name)
+        with scene_lock:
+            # If this light was previously defined as an area lamp, delete the area lamp mesh
+            luxcore_scene.DeleteObject(_get_area_obj_name(luxcore_name))
+            # If this light was previously defined as a light, delete it
+            luxcore_scene.DeleteLight(luxcore_name)
 
         prefix = "scene.lights." + luxcore_name + "."
 
         if obj.data.luxcore.use_cycles_settings:
             return _convert_cycles_light(exporter, obj, depsgraph, luxcore_scene, transform, is_viewport_render,
-                                         luxcore_name, scene, prefix)
+                                         luxcore_name, scene, prefix, scene_lock)
         else:
             return _convert_luxcore_light(exporter, obj, depsgraph, luxcore_scene, transform, is_viewport_render,
-                                          luxcore_name, scene, prefix)
+                                          luxcore_name, scene, prefix, scene_lock)
     except Exception as error:
         msg = 'Light "%s": %s' % (obj.name, error)
         LuxCoreErrorLog.add_warning(msg, obj_name=obj.name)
@@ -42,7 +47,7 @@ def convert_light(exporter, obj, obj_key, depsgraph, luxcore_scene, transform, i
 
 
 def _convert_cycles_light(exporter, obj, depsgraph, luxcore_scene, transform, is_viewport_render,
-                          luxcore_name, scene, prefix):
+                          luxcore_name, scene, prefix, scene_lock):
     definitions = {}
     light = obj.data
 
@@ -157,7 +162,8 @@ def _convert_cycles_light(exporter, obj, depsgraph, luxcore_scene, transform, is
         use_instancing = utils.use_instancing(obj, scene, is_viewport_render)
         visible_to_camera = False
         obj_props, exported_obj = _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name,
-                                                            luxcore_scene, mat_name, visible_to_camera)
+                                                            luxcore_scene, mat_name, visible_to_camera,
+                                                            scene_lock)
         props.Set(obj_props)
         return props, exported_obj
     else:
@@ -179,7 +185,7 @@ def _convert_cycles_light(exporter, obj, depsgraph, luxcore_scene, transform, is
 
 
 def _convert_luxcore_light(exporter, obj, depsgraph, luxcore_scene, transform, is_viewport_render,
-                           luxcore_name, scene, prefix):
+                           luxcore_name, scene, prefix, scene_lock):
     definitions = {}
     light = obj.data
     sun_dir = _calc_sun_dir(transform)
@@ -327,7 +333,7 @@ def _convert_luxcore_light(exporter, obj, depsgraph, luxcore_scene, transform, i
         else:
             # area (mesh light)
             return _convert_area_light(obj, scene, is_viewport_render, exporter, depsgraph, luxcore_scene, gain,
-                                       importance, luxcore_name, transform)
+                                       importance, luxcore_name, transform, scene_lock)
 
     else:
         # Can only happen if Blender changes its light types
@@ -647,7 +653,7 @@ def _get_area_obj_name(luxcore_name):
 
 
 def _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name, luxcore_scene,
-                              mat_name, visible_to_camera):
+                              mat_name, visible_to_camera, scene_lock):
     light = obj.data
     transform_matrix = calc_area_light_transformation(light, transform)
     if light.shape not in {"SQUARE", "RECTANGLE"}:
@@ -671,7 +677,9 @@ def _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name, luxc
         mesh_transform = transform_list
 
     shape_name = luxcore_name
-    if not luxcore_scene.IsMeshDefined(shape_name):
+    with scene_lock:
+        is_mesh_defined = luxcore_scene.IsMeshDefined(shape_name)
+    if not is_mesh_defined:
         vertices = [
             (1, 1, 0),
             (1, -1, 0),
@@ -694,7 +702,8 @@ def _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name, luxc
             (0, 0),
             (0, 1),
         ]
-        luxcore_scene.DefineMesh(shape_name, vertices, faces, normals, uvs, None, None, mesh_transform)
+        with scene_lock:
+            luxcore_scene.DefineMesh(shape_name, vertices, faces, normals, uvs, None, None, mesh_transform)
 
     fake_material_index = 0
     # The material index after the luxcore_name is expected by ExportedObject
@@ -717,7 +726,7 @@ def _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name, luxc
 
 
 def _convert_area_light(obj, scene, is_viewport_render, exporter, depsgraph, luxcore_scene,
-                        gain, importance, luxcore_name, transform):
+                        gain, importance, luxcore_name, transform, scene_lock):
     """
     An area light is a plane object with emissive material in LuxCore
     """
@@ -823,7 +832,8 @@ def _convert_area_light(obj, scene, is_viewport_render, exporter, depsgraph, lux
     use_instancing = utils.use_instancing(obj, scene, is_viewport_render)
     visible_to_camera = obj.luxcore.visible_to_camera and light.luxcore.visible
     obj_props, exported_obj = _create_luxcore_meshlight(obj, transform, use_instancing, luxcore_name,
-                                                        luxcore_scene, mat_name, visible_to_camera)
+                                                        luxcore_scene, mat_name, visible_to_camera,
+                                                        scene_lock)
     props.Set(obj_props)
     return props, exported_obj
 
@@ -48,8 +48,13 @@ def convert(exporter, depsgraph, material, is_viewport_render, obj_name=""):
             msg = f'Material "{material.name}": Combining volumes and materials with opacity < 1 can lead to artifacts!'
             LuxCoreErrorLog.add_warning(msg, obj_name=obj_name)
 
-        # Now export the material node tree, starting at the output node
-        active_output.export(exporter, depsgraph, props, luxcore_name)
+        # Now export the material node tree, starting at the output node.
+        # Nodes that change with the frame register exported_material in frame_change_pre.
+        exporter.exported_material = material
+        try:
+            active_output.export(exporter, depsgraph, props, luxcore_name)
+        finally:
+            exporter.exported_material = None
 
         return luxcore_name, props
     except Exception as error:
@@ -0,0 +1,341 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+_needs_reload = "bpy" in locals()
+
+import bpy
+
+from .. import utils
+from . import mesh_converter
+from .mesh_converter import get_ndarray
+
+if _needs_reload:
+    import importlib
+
+    importlib.reload(utils)
+    importlib.reload(mesh_converter)
+
+
+# Increment when the layout of the stored arrays changes, so old cache
+# entries are not picked up anymore
+CACHE_FORMAT_VERSION = 1
+CACHE_FILE_EXTENSION = ".npz"
+
+# Modifier properties that change without affecting the evaluated mesh
+_IGNORED_MODIFIER_PROPS = {
+    "rna_type",
+    "name",
+    "is_active",
+    "is_override_data_editable",
+    "show_expanded",
+    "show_in_editmode",
+    "show_on_cage",
+    "execution_time",
+    "persistent_uid",
+}
+
+# Modifiers whose result only depends on their own settings and the input mesh.
+# Everything else (simulations, time-dependent effects like Wave or Build, mesh
+# sequence caches etc.) can change from frame to frame without any change of
+# the hashed inputs, so those meshes are not cached.
+_PURE_MODIFIER_TYPES = {
+    "ARRAY",
+    "BEVEL",
+    "CAST",
+    "DECIMATE",
+    "DISPLACE",
+    "EDGE_SPLIT",
+    "LAPLACIANSMOOTH",
+    "MIRROR",
+    "NORMAL_EDIT",
+    "REMESH",
+    "SCREW",
+    "SIMPLE_DEFORM",
+    "SMOOTH",
+    "SOLIDIFY",
+    "SUBSURF",
+    "TRIANGULATE",
+    "UV_WARP",
+    "WELD",
+    "WEIGHTED_NORMAL",
+    "WIREFRAME",
+}
+
+# Maps attribute data types to (foreach_get attribute, width, dtype)
+_ATTRIBUTE_LAYOUTS = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "INT8": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, bool),
+    "FLOAT2": ("vector", 2, np.float32),
+    "INT32_2D": ("value", 2, np.int32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+    "QUATERNION": ("value", 4, np.float32),
+}
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+class PersistentMeshCache:
+    """
+    On-disk cache for the data extracted from evaluated meshes.
+    Entries are keyed by a hash of the original mesh data and the modifier
+    stack, so identical static meshes are only extracted once across frames
+    and re-renders. The cache directory is kept below a size limit by
+    deleting the least recently used entries.
+    """
+
+    def __init__(self, directory, max_size_bytes, stats=None, scene=None):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.stats = stats
+        # Scene settings that change the evaluated meshes, part of every key
+        self.scene_inputs = _get_scene_inputs(scene) if scene else None
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings, scene, stats=None):
+        if settings.directory:
+            directory = utils.get_abspath(settings.directory, library=scene.library)
+        else:
+            directory = str(utils.get_user_dir("mesh_cache"))
+        return cls(directory, settings.max_size * 1024**2, stats, scene)
+
+    def make_key(self, obj, weld_vertices=False):
+        """
+        Returns a content hash for the mesh of obj, or None if the
+        evaluated mesh depends on data that is not part of the hash
+        (other objects, textures, geometry nodes etc.)
+        Welded meshes are stored separately from unwelded ones.
+        """
+        obj = obj.original
+        if obj.type != "MESH" or obj.data is None:
+            return None
+
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(
+            repr((CACHE_FORMAT_VERSION, bpy.app.version, self.scene_inputs)).encode()
+        )
+        if weld_vertices:
+            hasher.update(b"weld_vertices")
+
+        try:
+            self._hash_mesh(hasher, obj.data)
+            self._hash_modifiers(hasher, obj)
+        except _Uncacheable:
+            return None
+
+        return hasher.hexdigest()
+
+    def load(self, key):
+        filepath = self._get_filepath(key)
+        try:
+            with np.load(filepath) as archive:
+                mesh_data = _unpack(archive)
+        except FileNotFoundError:
+            self._count_miss()
+            return None
+        except (OSError, ValueError, KeyError) as error:
+            print(f'[Mesh Cache] Could not read "{filepath}": {error}')
+            self._count_miss()
+            return None
+
+        # Used as "last access" time for the LRU eviction
+        os.utime(filepath)
+        if self.stats:
+            self.stats.mesh_cache_hits.value += 1
+        return mesh_data
+
+    def store(self, key, mesh_data):
+        filepath = self._get_filepath(key)
+        temp_filepath = None
+
+        try:
+            # Unique per writer, processes of a render farm might store the same key at once.
+            # The suffix is not CACHE_FILE_EXTENSION, so evict() ignores unfinished files
+            fd, temp_filepath = tempfile.mkstemp(dir=self.directory, suffix=".npz.tmp")
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, **_pack(mesh_data))
+            # Atomic, so other processes never see partial files
+            os.replace(temp_filepath, filepath)
+        except OSError as error:
+            print(f'[Mesh Cache] Could not write "{filepath}": {error}')
+            if temp_filepath:
+                try:
+                    os.remove(temp_filepath)
+                except OSError:
+                    pass
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits into max_size_bytes"""
+        entries = []
+        total_size = 0
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_FILE_EXTENSION):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        if total_size <= self.max_size_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            if total_size <= self.max_size_bytes:
+                break
+
+    def _get_filepath(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+    def _count_miss(self):
+        if self.stats:
+            self.stats.mesh_cache_misses.value += 1
+
+    @staticmethod
+    def _hash_mesh(hasher, mesh):
+        if mesh.is_editmode:
+            raise _Uncacheable()
+
+        hasher.update(get_ndarray(mesh.loops, "vertex_index", 0, np.uint32))
+        hasher.update(get_ndarray(mesh.polygons, "loop_start", 0, np.uint32))
+        hasher.update(get_ndarray(mesh.edges, "vertices", 2, np.uint32))
+
+        for attribute in mesh.attributes:
+            try:
+                attr_name, width, dtype = _ATTRIBUTE_LAYOUTS[attribute.data_type]
+            except KeyError:
+                raise _Uncacheable()
+            hasher.update(
+                repr((attribute.name, attribute.domain, attribute.data_type)).encode()
+            )
+            hasher.update(get_ndarray(attribute.data, attr_name, width, dtype))
+
+        if mesh.has_custom_normals:
+            # Custom split normals are not part of mesh.attributes in all Blender versions
+            hasher.update(get_ndarray(mesh.corner_normals, "vector", 3, np.float32))
+
+        # Removed in Blender 4.1, sharp edges are stored as attributes now
+        hasher.update(
+            repr(
+                (
+                    getattr(mesh, "use_auto_smooth", None),
+                    getattr(mesh, "auto_smooth_angle", None),
+                )
+            ).encode()
+        )
+
+        if mesh.shape_keys:
+            for key_block in mesh.shape_keys.key_blocks:
+                if key_block.vertex_group:
+                    # Vertex group weights are not part of mesh.attributes
+                    raise _Uncacheable()
+                hasher.update(
+                    repr(
+                        (
+                            key_block.name,
+                            key_block.value,
+                            key_block.mute,
+                            key_block.vertex_group,
+                            key_block.relative_key.name,
+                        )
+                    ).encode()
+                )
+                hasher.update(get_ndarray(key_block.data, "co", 3, np.float32))
+
+    @classmethod
+    def _hash_modifiers(cls, hasher, obj):
+        if obj.modifiers and obj.vertex_groups:
+            # Vertex group weights are not part of mesh.attributes
+            raise _Uncacheable()
+
+        for modifier in obj.modifiers:
+            if modifier.type not in _PURE_MODIFIER_TYPES:
+                # E.g. geometry nodes, simulations or time-dependent modifiers
+                raise _Uncacheable()
+            cls._hash_struct(hasher, modifier, _IGNORED_MODIFIER_PROPS)
+
+    @classmethod
+    def _hash_struct(cls, hasher, struct, ignored=frozenset(), depth=0):
+        if depth > 3:
+            raise _Uncacheable()
+
+        for prop in struct.bl_rna.properties:
+            identifier = prop.identifier
+            if identifier in ignored:
+                continue
+            value = getattr(struct, identifier)
+
+            if prop.type == "POINTER":
+                if value is None:
+                    hasher.update(b"None")
+                elif isinstance(value, bpy.types.ID):
+                    # E.g. textures, armatures or boolean operands
+                    raise _Uncacheable()
+                else:
+                    cls._hash_struct(hasher, value, depth=depth + 1)
+            elif prop.type == "COLLECTION":
+                for item in value:
+                    cls._hash_struct(hasher, item, depth=depth + 1)
+            else:
+                if getattr(prop, "is_array", False):
+                    value = tuple(value)
+                elif isinstance(value, set):
+                    value = sorted(value)
+                hasher.update(repr((identifier, value)).encode())
+
+
+def _get_scene_inputs(scene):
+    # The mesh cache is only used for final renders, so only the render settings matter
+    render = scene.render
+    if render.use_simplify:
+        return ("simplify", render.simplify_subdivision_render)
+    return None
+
+
+def _pack(mesh_data):
+    arrays = {
+        "loop_points": mesh_data.loop_points,
+        "loop_normals": mesh_data.loop_normals,
+        "triangle_loops": mesh_data.triangle_loops,
+        "triangle_materials": mesh_data.triangle_materials,
+    }
+    for i, uv in enumerate(mesh_data.uvs):
+        arrays[f"uv{i}"] = uv
+    for i, (rgb, alpha) in enumerate(zip(mesh_data.rgb, mesh_data.alphas)):
+        arrays[f"rgb{i}"] = rgb
+        arrays[f"alpha{i}"] = alpha
+    return arrays
+
+
+def _unpack(archive):
+    def layers(prefix):
+        result = []
+        while (name := f"{prefix}{len(result)}") in archive:
+            result.append(archive[name])
+        return result
+
+    return mesh_converter.MeshData(
+        archive["loop_points"],
+        archive["loop_normals"],
+        archive["triangle_loops"],
+        archive["triangle_materials"],
+        layers("uv"),
+        layers("rgb"),
+        layers("alpha"),
+    )
@@ -1,4 +1,8 @@
-from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import os
+import threading
 from time import time
 import numpy as np
 
@@ -9,6 +13,7 @@ import bpy
 from . import caches
 from .. import utils
 from ..utils.errorlog import LuxCoreErrorLog
+from ..utils.profiler import ExportProfiler
 
 if _needs_reload:
     import importlib
@@ -17,6 +22,18 @@ if _needs_reload:
     importlib.reload(utils)
 
 
+# Used when convert() is called without exporter
+_DISABLED_PROFILER = ExportProfiler()
+
+# Mesh.corner_normals (Blender 4.1+) contains the final per-corner normals,
+# including sharp edges, flat faces and custom normals. Without it, the mesh
+# has to be split with split_faces() so the vertex normals can be used instead.
+USE_CORNER_NORMALS = "corner_normals" in bpy.types.Mesh.bl_rna.properties
+
+# Guards the vertex welding stats, which are updated from the pipeline threads
+_stats_lock = threading.Lock()
+
+
 # https://blenderartists.org/t/\
 # efficient-copying-of-vertex-coords-to-and-from-numpy-arrays/661467/2
 def get_ndarray(
@@ -37,6 +54,101 @@ def get_ndarray(
     return buffer
 
 
+class RawMeshData:
+    """
+    The arrays read from a temporary Blender mesh with foreach_get(), still
+    in their original domains. They do not reference the Blender mesh, so
+    they can be processed after the mesh was freed, on another thread.
+    """
+
+    def __init__(
+        self,
+        loop_vertices,
+        vertex_points,
+        normals,
+        normals_domain,
+        triangle_loops,
+        triangle_materials,
+        uvs,
+        colors,
+    ):
+        self.loop_vertices = loop_vertices
+        self.vertex_points = vertex_points
+        # Per corner normals, or per vertex normals of a mesh processed with split_faces()
+        self.normals = normals
+        self.normals_domain = normals_domain
+        self.triangle_loops = triangle_loops
+        self.triangle_materials = triangle_materials
+        self.uvs = uvs
+        # List of (rgba, domain) tuples
+        self.colors = colors
+
+
+class MeshData:
+    """The arrays extracted from a Blender mesh, ready for DefineMeshExt()"""
+
+    def __init__(
+        self,
+        loop_points,
+        loop_normals,
+        triangle_loops,
+        triangle_materials,
+        uvs,
+        rgb,
+        alphas,
+    ):
+        self.loop_points = loop_points
+        self.loop_normals = loop_normals
+        self.triangle_loops = triangle_loops
+        self.triangle_materials = triangle_materials
+        self.uvs = uvs
+        self.rgb = rgb
+        self.alphas = alphas
+
+
+class DefinePipeline:
+    """
+    Runs the NumPy post-processing and the DefineMeshExt() calls of
+    convert() in worker threads, while the main thread is busy extracting
+    the next mesh from Blender.
+
+    pyluxcore.Scene is not documented to be thread-safe, so all calls into
+    it (from the workers and from the main thread) have to hold scene_lock.
+    Call wait() before the scene is parsed or used otherwise.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="BLC_mesh"
+        )
+        # Limits how many extracted meshes can wait in memory for a worker
+        self._max_pending = 2 * max_workers
+        self._pending = deque()
+        self.scene_lock = threading.Lock()
+
+    def wait_for_capacity(self):
+        """Block until another job can be submitted without exceeding the pending limit"""
+        while len(self._pending) >= self._max_pending:
+            self._pending.popleft().result()
+
+    def submit(self, func, *args):
+        self.wait_for_capacity()
+        self._pending.append(self._executor.submit(func, *args))
+
+    def wait(self):
+        """Block until all submitted jobs are done, re-raises their exceptions"""
+        while self._pending:
+            self._pending.popleft().result()
+
+    def shutdown(self):
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._pending.clear()
+
+
 def convert(
     obj,
     mesh_key,
@@ -46,129 +158,370 @@ def convert(
     use_instancing,
     transform,
     exporter=None,
+    mesh_cache=None,
+    pipeline=None,
 ):
     start_time = time()
+    profiler = exporter.profiler if exporter else _DISABLED_PROFILER
+    weld_vertices = exporter.weld_vertices if exporter else False
+
+    mesh_data = None
+    cache_key = None
+    if mesh_cache:
+        with profiler.span("Mesh Cache Load", obj.name):
+            cache_key = mesh_cache.make_key(obj, weld_vertices)
+            if cache_key:
+                mesh_data = mesh_cache.load(cache_key)
+
+    if mesh_data is None:
+        with profiler.span("Mesh Extract", obj.name):
+            with _prepare_mesh(
+                obj, depsgraph, split_faces=not USE_CORNER_NORMALS
+            ) as mesh:
+                if mesh is None:
+                    return None
+                mesh_data = extract(mesh)
+
+    # The shape names only depend on the material indices, so we can return
+    # them right away even if the shapes are defined later by the pipeline
+    material_indices = _get_used_material_indices(mesh_data.triangle_materials)
+    mesh_definitions = [
+        (_make_shape_name(mesh_key, mat), mat) for mat in material_indices
+    ]
+    job_args = (
+        luxcore_scene,
+        mesh_key,
+        mesh_data,
+        material_indices,
+        _get_mesh_transform(transform, is_viewport_render, use_instancing),
+        mesh_cache if cache_key else None,
+        cache_key,
+        profiler,
+        weld_vertices,
+        exporter.stats if exporter else None,
+    )
+
+    if pipeline:
+        # Waits for the jobs of other meshes, so it doesn't count as time of this object
+        with profiler.wait_span("Pipeline Wait"):
+            pipeline.wait_for_capacity()
+        pipeline.submit(
+            _define_job_for_object, obj.name, profiler, pipeline.scene_lock, *job_args
+        )
+    else:
+        _define_job(None, *job_args)
 
-    with _prepare_mesh(obj, depsgraph) as mesh:
-        if mesh is None:
-            return None
+    duration = time() - start_time
+    if exporter and exporter.stats:
+        exporter.stats.export_time_meshes.value += duration
 
-        # Blender API may not be always consistent with naming, for the mesh object.
-        # For the sake of clarity, we list here our naming conventions.
-        # They may specially differ from attribute domains...
-        # https://docs.blender.org/api/current/bpy_types_enum_items/attribute_domain_items.html#rna-enum-attribute-domain-items
-        # Point: a point in the 3D-space, (float, float, float)
-        # Vertex: an index to the mesh array of points
-        # Loop: a vertex and an edge
+    return caches.exported_data.ExportedMesh(mesh_definitions)
 
-        # Loop vertices
-        loop_vertices = get_ndarray(mesh.loops, "vertex_index", 0, np.uint32)
 
-        # Points
-        vertex_points = get_ndarray(mesh.vertices, "co", 3, np.float32)
-        loop_points = vertex_points[loop_vertices]
+def extract(mesh, use_corner_normals=USE_CORNER_NORMALS):
+    """
+    Read all data needed by LuxCore from a (temporary) Blender mesh.
+    Only does the work that needs the Blender API, see gather() for the rest.
+    Without use_corner_normals, the mesh has to be processed with split_faces() first.
+    """
+    # Blender API may not be always consistent with naming, for the mesh object.
+    # For the sake of clarity, we list here our naming conventions.
+    # They may specially differ from attribute domains...
+    # https://docs.blender.org/api/current/bpy_types_enum_items/attribute_domain_items.html#rna-enum-attribute-domain-items
+    # Point: a point in the 3D-space, (float, float, float)
+    # Vertex: an index to the mesh array of points
+    # Loop: a vertex and an edge
+
+    # Loop vertices
+    loop_vertices = get_ndarray(mesh.loops, "vertex_index", 0, np.uint32)
+
+    # Points
+    vertex_points = get_ndarray(mesh.vertices, "co", 3, np.float32)
+
+    # Normals
+    if use_corner_normals:
+        normals = get_ndarray(mesh.corner_normals, "vector", 3, np.float32)
+        normals_domain = "CORNER"
+    else:
+        normals = get_ndarray(mesh.vertices, "normal", 3, np.float32)
+        normals_domain = "POINT"
+
+    # Triangle loop indices
+    triangle_loops = get_ndarray(mesh.loop_triangles, "loops", 3, np.uint32)
+
+    # Material slot index for each triangle
+    triangle_materials = get_ndarray(
+        mesh.loop_triangles, "material_index", 1, np.uint32
+    ).ravel()
+
+    # UV
+    uvs = [
+        get_ndarray(uv_layer.uv, "vector", 2, np.float32)
+        for uv_layer in mesh.uv_layers
+    ]
+
+    # Vertex colors
+    colors = [
+        (get_ndarray(attribute.data, "color", 4, np.float32), attribute.domain)
+        for attribute in mesh.color_attributes
+    ]
+
+    return RawMeshData(
+        loop_vertices,
+        vertex_points,
+        normals,
+        normals_domain,
+        triangle_loops,
+        triangle_materials,
+        uvs,
+        colors,
+    )
+
+
+def gather(raw_mesh_data):
+    """Convert RawMeshData to MeshData with all attributes in the loop domain"""
+    loop_vertices = raw_mesh_data.loop_vertices
+
+    def to_loop_domain(values, domain):
+        if domain == "POINT":
+            return values[loop_vertices]
+        elif domain == "CORNER":
+            return values
+        else:
+            raise ValueError(f"Unhandled attribute domain: '{domain}'")
 
-        # Normals
-        vertex_normals = get_ndarray(mesh.vertices, "normal", 3, np.float32)
-        loop_normals = vertex_normals[loop_vertices]
+    rgba_colors = [
+        to_loop_domain(colors, domain)
+        for colors, domain in raw_mesh_data.colors
+    ]
 
-        # Triangle loop indices
-        triangle_loops = get_ndarray(
-            mesh.loop_triangles, "loops", 3, np.uint32
-        )
+    return MeshData(
+        raw_mesh_data.vertex_points[loop_vertices],
+        to_loop_domain(raw_mesh_data.normals, raw_mesh_data.normals_domain),
+        raw_mesh_data.triangle_loops,
+        raw_mesh_data.triangle_materials,
+        raw_mesh_data.uvs,
+        [rgba[:, :3] for rgba in rgba_colors],
+        [rgba[:, 3] for rgba in rgba_colors],
+    )
 
-        # Material slot index for each triangle
-        loop_triangle_materials = get_ndarray(
-            mesh.loop_triangles, "material_index", 1, np.uint32
-        ).ravel()
-        unique_mats = np.unique(loop_triangle_materials)
 
-        # UV
-        uvs = [
-            get_ndarray(uv_layer.uv, "vector", 2, np.float32)
-            for uv_layer in mesh.uv_layers
+def weld(mesh_data, loop_vertices):
+    """
+    Merge the loops that share their vertex and all attributes (normal, UVs, colors),
+    so LuxCore receives one vertex per unique combination instead of one per loop.
+    loop_vertices are the vertex indices of the loops, as returned by extract().
+    Returns a new MeshData with the triangles remapped to the merged vertices.
+    """
+    # One row per loop, the float attributes are compared bitwise
+    columns = [
+        loop_vertices.reshape(-1, 1),
+        mesh_data.loop_normals.view(np.uint32),
+    ]
+    columns += [uv.view(np.uint32) for uv in mesh_data.uvs]
+    columns += [rgb.view(np.uint32) for rgb in mesh_data.rgb]
+    columns += [alpha.view(np.uint32).reshape(-1, 1) for alpha in mesh_data.alphas]
+    keys = np.hstack(columns)
+
+    rows = keys.view(np.dtype((np.void, keys.shape[1] * keys.itemsize))).ravel()
+    _, first_loops, inverse = np.unique(
+        rows, return_index=True, return_inverse=True
+    )
+
+    # Keep the order of the first occurrences, for better memory locality
+    order = np.argsort(first_loops)
+    kept_loops = first_loops[order]
+    remap = np.empty(len(order), dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+    loop_remap = remap[inverse.ravel()]
+
+    return MeshData(
+        mesh_data.loop_points[kept_loops],
+        mesh_data.loop_normals[kept_loops],
+        loop_remap[mesh_data.triangle_loops],
+        mesh_data.triangle_materials,
+        [uv[kept_loops] for uv in mesh_data.uvs],
+        [rgb[kept_loops] for rgb in mesh_data.rgb],
+        [alpha[kept_loops] for alpha in mesh_data.alphas],
+    )
+
+
+def define(
+    luxcore_scene,
+    mesh_key,
+    mesh_data,
+    material_indices,
+    mesh_transform,
+    scene_lock=None,
+    profiler=_DISABLED_PROFILER,
+):
+    """Define one LuxCore mesh per material index used in mesh_data"""
+    # With several submeshes, each one only receives the loops it references,
+    # instead of a full copy of all vertex attributes
+    compact_submeshes = len(material_indices) > 1
+    loop_remap = (
+        np.empty(len(mesh_data.loop_points), dtype=np.uint32)
+        if compact_submeshes
+        else None
+    )
+
+    for mat in material_indices:
+        mat_triangles = mesh_data.triangle_loops[
+            mesh_data.triangle_materials == mat
         ]
 
-        # Vertex colors
-        def reshape_colors(colors, domain):
-            if domain == "POINT":
-                return colors[loop_vertices]
-            elif domain == "CORNER":
-                return colors
-            else:
-                raise ValueError(f"Unhandled attribute domain: '{domain}'")
-
-        rgba_colors = [
-            reshape_colors(
-                get_ndarray(attribute.data, "color", 4, np.float32),
-                attribute.domain,
+        if compact_submeshes:
+            used_loops, mat_triangles = _compact_submesh(
+                mat_triangles, loop_remap
             )
-            for attribute in mesh.color_attributes
-        ]
-        rgb = [rgba[:, :3] for rgba in rgba_colors]
-        alphas = [rgba[:, 3] for rgba in rgba_colors]
-
-        # Transformation
-        if is_viewport_render or use_instancing:
-            mesh_transform = None
+            points = mesh_data.loop_points[used_loops]
+            normals = mesh_data.loop_normals[used_loops]
+            uvs = [uv[used_loops] for uv in mesh_data.uvs]
+            rgb = [colors[used_loops] for colors in mesh_data.rgb]
+            alphas = [alpha[used_loops] for alpha in mesh_data.alphas]
         else:
-            mesh_transform = np.array(
-                [
-                    transform[0][0:4],
-                    transform[1][0:4],
-                    transform[2][0:4],
-                    transform[3][0:4],
-                ],
-                dtype=np.float32,
+            points = mesh_data.loop_points
+            normals = mesh_data.loop_normals
+            uvs = mesh_data.uvs
+            rgb = mesh_data.rgb
+            alphas = mesh_data.alphas
+
+        # The args are only computed if the export is profiled
+        span = (
+            profiler.span(
+                "DefineMeshExt",
+                str(mesh_key),
+                submesh=int(mat),
+                triangles=len(mat_triangles),
+                points=len(points),
+                uv_layers=len(uvs),
+                color_layers=len(rgb),
+                bytes=_get_nbytes(
+                    mat_triangles, points, normals, *uvs, *rgb, *alphas
+                ),
             )
+            if profiler.enabled
+            else nullcontext()
+        )
 
-        # Log
-        def fmt_layer(layers, layer_name):
-            nlayers = len(layers)
-            suffix = "layers" if nlayers > 1 else "layer"
-            return f"{nlayers} {layer_name} {suffix}"
-        print(f"[BLC] Exporting '{str(mesh_key)}' - {len(unique_mats)} submesh(es)")
-        print(f"[BLC] - {len(loop_points)} points")
-        print(f"[BLC] - {len(loop_normals)} normals")
-        print(f"[BLC] - {fmt_layer(uvs, 'uv')}")
-        print(f"[BLC] - {fmt_layer(rgb, 'color')}")
-        print(f"[BLC] - {fmt_layer(alphas, 'alpha')}")
-
-        mesh_definitions = []
-        for mat in unique_mats:
-            mat_triangles = triangle_loops[loop_triangle_materials == mat]
-            name = f"{str(mesh_key)}{mat:03d}"
-
-
-            print(f"[BLC] - Submesh #{mat:03d}: {len(mat_triangles)} triangles")
-
+        with span, scene_lock or nullcontext():
             luxcore_scene.DefineMeshExt(
-                name=name,
-                points=loop_points,
+                name=_make_shape_name(mesh_key, mat),
+                points=points,
                 triangles=mat_triangles,
-                normals=loop_normals,
+                normals=normals,
                 uvs=uvs,
                 colors=rgb,
                 alphas=alphas,
                 transformation=mesh_transform,
             )
-            mesh_definitions.append((name, mat))
 
-        duration = time() - start_time
-        if exporter and exporter.stats:
-            exporter.stats.export_time_meshes.value += duration
-        print(f"[BLC] Export duration: {duration:.3f}s")
-        print("[BLC]")
 
-        return caches.exported_data.ExportedMesh(mesh_definitions)
+def _define_job(
+    scene_lock,
+    luxcore_scene,
+    mesh_key,
+    mesh_data,
+    material_indices,
+    mesh_transform,
+    mesh_cache,
+    cache_key,
+    profiler,
+    weld_vertices,
+    stats,
+):
+    if isinstance(mesh_data, RawMeshData):
+        loop_vertices = mesh_data.loop_vertices
+        with profiler.span("Mesh Gather", str(mesh_key)):
+            mesh_data = gather(mesh_data)
+
+        if weld_vertices:
+            with profiler.span("Mesh Weld", str(mesh_key)):
+                welded_mesh_data = weld(mesh_data, loop_vertices)
+            if stats:
+                with _stats_lock:
+                    loop_count, vertex_count = stats.vertex_welding.value
+                    stats.vertex_welding.value = (
+                        loop_count + len(mesh_data.loop_points),
+                        vertex_count + len(welded_mesh_data.loop_points),
+                    )
+            mesh_data = welded_mesh_data
+
+        # Welded meshes have their own cache keys, see convert()
+        if mesh_cache:
+            with profiler.span("Mesh Cache Store", str(mesh_key)):
+                mesh_cache.store(cache_key, mesh_data)
+
+    define(
+        luxcore_scene,
+        mesh_key,
+        mesh_data,
+        material_indices,
+        mesh_transform,
+        scene_lock,
+        profiler,
+    )
+
+
+def _define_job_for_object(obj_name, profiler, scene_lock, *job_args):
+    # The object_span of the main thread has ended when this runs on the pipeline,
+    # so the worker time is accumulated separately for the slowest objects table
+    with profiler.object_span(obj_name):
+        _define_job(scene_lock, *job_args)
+
+
+def _get_nbytes(*arrays):
+    return sum(array.nbytes for array in arrays if array is not None)
+
+
+def _get_used_material_indices(triangle_materials):
+    # Linear time, unlike np.unique() which sorts
+    return np.flatnonzero(np.bincount(triangle_materials))
+
+
+def _make_shape_name(mesh_key, material_index):
+    return f"{str(mesh_key)}{material_index:03d}"
+
+
+def _compact_submesh(triangles, loop_remap):
+    """
+    Find the loops referenced by the triangles of one submesh and re-index
+    the triangles so they point into the compacted loop arrays.
+    loop_remap is a scratch buffer with one entry per loop of the whole mesh.
+
+    Returns (used_loops, compacted_triangles)
+    """
+    is_used = np.zeros(len(loop_remap), dtype=bool)
+    is_used[triangles] = True
+    # Sorted, so the original loop order (and memory locality) is kept
+    used_loops = np.flatnonzero(is_used)
+    loop_remap[used_loops] = np.arange(len(used_loops), dtype=np.uint32)
+    return used_loops, loop_remap[triangles]
+
+
+def _get_mesh_transform(transform, is_viewport_render, use_instancing):
+    if is_viewport_render or use_instancing:
+        return None
+
+    return np.array(
+        [
+            transform[0][0:4],
+            transform[1][0:4],
+            transform[2][0:4],
+            transform[3][0:4],
+        ],
+        dtype=np.float32,
+    )
 
 
 @contextmanager
-def _prepare_mesh(obj, depsgraph):
+def _prepare_mesh(obj, depsgraph, split_faces=False):
     """
     Create a temporary mesh from an object.
     The mesh is guaranteed to be removed when the calling block ends.
     Can return None if no mesh could be created from the object (e.g. for empties)
+    With split_faces, the mesh is split along sharp edges, so its vertex normals
+    can be used (fallback for Blender versions without Mesh.corner_normals).
 
     Use it like this:
 
@@ -200,8 +553,7 @@ def _prepare_mesh(obj, depsgraph):
                     object_eval.to_mesh_clear()
                     mesh = None
 
-            # TODO implement new normals handling
-            if mesh:
+            if mesh and split_faces:
                 mesh.split_faces()  # Applies smooth by angle operator
 
         yield mesh
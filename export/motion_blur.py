@@ -1,4 +1,6 @@
 import math
+from array import array
+import numpy as np
 import pyluxcore
 from .. import utils
 from .caches.exported_data import ExportedObject, ExportedLight
@@ -6,7 +8,11 @@ from .caches.exported_data import ExportedObject, ExportedLight
 
 # TODO fix motion blur of area lights, they get a wrong transformation
 
-def convert(context, engine, scene, depsgraph, exported_objects):
+def convert(context, engine, scene, depsgraph, exported_objects, instances=None):
+    """
+    instances: The Duplis returned by ObjectCache2.first_run(). Their per-step matrices
+    are collected while stepping through the frames, see Duplis.finish_motion()
+    """
     assert scene.camera
     motion_blur = scene.camera.data.luxcore.motion_blur
     assert motion_blur.enable and (motion_blur.object_blur or motion_blur.camera_blur)
@@ -15,94 +21,240 @@ def convert(context, engine, scene, depsgraph, exported_objects):
     assert steps >= 2 and isinstance(steps, int)
 
     frame_offsets = _calc_frame_offsets(motion_blur.shutter, steps)
-    matrices = _get_matrices(context, engine, scene, steps, frame_offsets, depsgraph, exported_objects)
-
-    # Find and delete entries of non-moving objects (where all matrices are equal)
-    for prefix, matrix_steps in list(matrices.items()):
-        matrices_equal = utils.all_elems_equal(matrix_steps)
-
-        if matrices_equal:
-            # This object does not need motion blur because it does not move
-            del matrices[prefix]
+    object_motion = ObjectMotion(depsgraph, exported_objects, instances, steps) if motion_blur.object_blur else None
+    camera_blur = motion_blur.camera_blur and not context
+    camera_matrices = _sample(engine, scene, steps, frame_offsets, object_motion, camera_blur)
 
     # Export the properties for moving objects
     props = pyluxcore.Properties()
 
-    for prefix, matrix_steps in matrices.items():
+    if object_motion:
+        for exported_obj, matrix_steps in object_motion.get_moving_objects():
+            for part in exported_obj.parts:
+                prefix = "scene.objects." + part.lux_obj + "."
+                for step in range(steps):
+                    definitions = {
+                        "motion.%d.time" % step: frame_offsets[step],
+                        "motion.%d.transformation" % step: matrix_steps[step].ravel().tolist(),
+                    }
+                    props.Set(utils.luxutils.create_props(prefix, definitions))
+
+        for duplis in object_motion.instances.values():
+            if duplis:
+                duplis.finish_motion(frame_offsets)
+
+    # We need this information outside
+    is_camera_moving = bool(camera_matrices) and not utils.all_elems_equal(camera_matrices)
+
+    if is_camera_moving:
+        prefix = "scene.camera."
         for step in range(steps):
-            time = frame_offsets[step]
-            matrix = matrix_steps[step]
-            transformation = utils.luxutils.matrix_to_list(matrix)
             definitions = {
-                "motion.%d.time" % step: time,
-                "motion.%d.transformation" % step: transformation,
+                "motion.%d.time" % step: frame_offsets[step],
+                "motion.%d.transformation" % step: utils.luxutils.matrix_to_list(camera_matrices[step]),
             }
             props.Set(utils.luxutils.create_props(prefix, definitions))
 
-    # We need this information outside
-    is_camera_moving = "scene.camera." in matrices
     return props, is_camera_moving
 
 
 def _calc_frame_offsets(shutter, steps):
-    """ Return a list of offsets (unit: frame) to step through in _get_matrices() """
+    """ Return a list of offsets (unit: frame) to step through in _sample() """
     step_interval = shutter / (steps - 1)
     return [step_interval * step - shutter / 2 for step in range(steps)]
 
 
-def _get_matrices(context, engine, scene, steps, frame_offsets, depsgraph, exported_objects):
-    motion_blur = scene.camera.data.luxcore.motion_blur
-    matrices = {}  # {prefix: [matrix1, matrix2, ...]}
+def _get_center_step(frame_offsets):
+    """The step that is sampled at the current frame (only exists for odd step counts)"""
+    if len(frame_offsets) % 2:
+        center = len(frame_offsets) // 2
+        if math.isclose(frame_offsets[center], 0, abs_tol=1e-6):
+            return center
+    return None
+
+
+def _sample(engine, scene, steps, frame_offsets, object_motion, camera_blur):
+    """Step through the frames and collect the matrices. Returns the camera matrices"""
+    camera_matrices = [None] * steps if camera_blur else []
 
     frame_center = scene.frame_current
     subframe_center = scene.frame_subframe
+
+    # The scene is already evaluated at the current frame and the regular export
+    # recorded the transformations, so we don't need to evaluate the center step again
+    center_step = _get_center_step(frame_offsets)
+    if center_step is not None:
+        if camera_blur:
+            camera_matrices[center_step] = scene.camera.matrix_world.copy()
+
     for step in range(steps):
+        if step == center_step:
+            continue
+
         offset = frame_offsets[step]
         frame = frame_center + subframe_center + offset
         frame_int = math.floor(frame)
         subframe = frame - frame_int
         engine.frame_set(frame_int, subframe)
-        if motion_blur.object_blur:
-            _append_object_matrices(depsgraph, exported_objects, matrices, step)
 
-        if motion_blur.camera_blur and not context:
-            matrix = scene.camera.matrix_world
+        if object_motion:
+            object_motion.sample(step)
+
+        if camera_blur:
+            camera_matrices[step] = scene.camera.matrix_world.copy()
 
-            prefix = "scene.camera."
-            _append_matrix(matrices, prefix, matrix, step)
+    if center_step is not None and object_motion and not object_motion.set_from_export(center_step):
+        # Not all transformations are known from the export
+        engine.frame_set(frame_center, subframe_center)
+        object_motion.sample(center_step)
 
     # Restore original frame
     engine.frame_set(frame_center, subframe_center)
-    return matrices
+    return camera_matrices
 
 
-def _append_object_matrices(depsgraph, exported_objects, matrices, step):
-    for dg_obj_instance in depsgraph.object_instances:
-        obj = dg_obj_instance.parent if dg_obj_instance.is_instance else dg_obj_instance.object
-        if not obj.luxcore.enable_motion_blur:
-            continue
+class ObjectMotion:
+    """
+    Per-step transformations of all exported objects with motion blur.
 
-        obj_key = utils.make_key_from_instance(dg_obj_instance)
-        matrix = dg_obj_instance.matrix_world.copy()
+    The mapping from depsgraph.object_instances to exported objects and duplis
+    is only looked up by key in the first sampled step, later steps just collect
+    the matrices of the known instance indices.
+    """
+
+    def __init__(self, depsgraph, exported_objects, instances, steps):
+        self.depsgraph = depsgraph
+        self.exported_objects = exported_objects
+        self.instances = instances or {}
+        self.steps = steps
+
+        # Index in depsgraph.object_instances -> row in self.matrices (int) or Duplis
+        self._targets = None
+        self._instance_count = 0
+        # Object key -> row in self.matrices
+        self._rows = {}
+        self.objects = []
+        # (objects, steps, 4, 4), in the layout of pyluxcore.BlenderMatrix4x4ToList()
+        self.matrices = None
+
+    def sample(self, step):
+        if self._targets is None:
+            self._targets, self._instance_count, collected = self._scan()
+            self.matrices = np.empty((len(self.objects), self.steps, 4, 4), dtype=np.float32)
+            self._commit(step, *collected)
+            # Objects missing in later steps keep the matrix of this step
+            self.matrices[:] = self.matrices[:, step:step + 1]
+            return
+
+        instance_count, collected = self._collect(self._targets)
+        if instance_count != self._instance_count:
+            # The instances changed (e.g. particles were born or died), so the
+            # indices from the first step are not valid in this step
+            _, _, collected = self._scan()
+        self._commit(step, *collected)
+
+    def set_from_export(self, step):
+        """
+        Fill the step with the transformations recorded by the regular export.
+        Returns False if they are not available for all objects
+        """
+        if self._targets is None:
+            return False
+        if any(exported_obj.transform is None for exported_obj in self.objects):
+            return False
+
+        rows = range(len(self.objects))
+        values = [utils.luxutils.matrix_to_list(exported_obj.transform) for exported_obj in self.objects]
+        dupli_values = {id(duplis): (duplis, duplis.matrices)
+                        for duplis in set(self._targets.values()) if not isinstance(duplis, int)}
+        self._commit(step, rows, values, dupli_values)
+        return True
+
+    def get_moving_objects(self):
+        """Yields (exported_obj, matrix_steps) for all objects where not all matrices are equal"""
+        if self.matrices is None:
+            return
+
+        is_static = (self.matrices == self.matrices[:, :1]).all(axis=(1, 2, 3))
+        for row in np.flatnonzero(~is_static):
+            yield self.objects[row], self.matrices[row]
+
+    def _scan(self):
+        """Find the exported objects and duplis of all instances by key"""
+        targets = {}
+        rows = []
+        values = []
+        dupli_values = {}
+        index = -1
+
+        for index, dg_obj_instance in enumerate(self.depsgraph.object_instances):
+            obj = dg_obj_instance.parent if dg_obj_instance.is_instance else dg_obj_instance.object
+            if not obj.luxcore.enable_motion_blur:
+                continue
+
+            obj_key = utils.make_key_from_instance(dg_obj_instance)
+
+            try:
+                exported_thing = self.exported_objects[obj_key]
+            except KeyError:
+                if dg_obj_instance.is_instance:
+                    # Duplicated with DuplicateObject, the first instance of each object
+                    # is the exported base object and is handled below
+                    duplis = self.instances.get(dg_obj_instance.object.session_uid)
+                    if duplis:
+                        targets[index] = duplis
+                        self._append_dupli_matrix(dupli_values, duplis, dg_obj_instance)
+                # Otherwise this is not a problem, objects are skipped during export for various reasons
+                # E.g. if the object is not visible, or if it's a camera
+                continue
 
-        try:
-            exported_thing = exported_objects[obj_key]
             if isinstance(exported_thing, ExportedObject):
-                for part in exported_thing.parts:
-                    prefix = "scene.objects." + part.lux_obj + "."
-                    _append_matrix(matrices, prefix, matrix, step)
+                row = self._rows.get(obj_key)
+                if row is None:
+                    if self.matrices is not None:
+                        # Not present in the first step
+                        continue
+                    row = len(self.objects)
+                    self._rows[obj_key] = row
+                    self.objects.append(exported_thing)
+                targets[index] = row
+                rows.append(row)
+                values.append(utils.luxutils.matrix_to_list(dg_obj_instance.matrix_world))
             # else:
             #     assert isinstance(exported_thing, ExportedLight)
-            #     prefix = "scene.lights." + exported_thing.lux_light_name + "."
-            #     _append_matrix(matrices, prefix, matrix, step)
-        except KeyError:
-            # This is not a problem, objects are skipped during export for various reasons
-            # E.g. if the object is not visible, or if it's a camera
-            pass
 
+        return targets, index + 1, (rows, values, dupli_values)
+
+    def _collect(self, targets):
+        rows = []
+        values = []
+        dupli_values = {}
+        index = -1
+
+        for index, dg_obj_instance in enumerate(self.depsgraph.object_instances):
+            target = targets.get(index)
+            if target is None:
+                continue
+
+            if isinstance(target, int):
+                rows.append(target)
+                values.append(utils.luxutils.matrix_to_list(dg_obj_instance.matrix_world))
+            else:
+                self._append_dupli_matrix(dupli_values, target, dg_obj_instance)
+
+        return index + 1, (rows, values, dupli_values)
+
+    @staticmethod
+    def _append_dupli_matrix(dupli_values, duplis, dg_obj_instance):
+        try:
+            matrices = dupli_values[id(duplis)][1]
+        except KeyError:
+            matrices = array("f", [])
+            dupli_values[id(duplis)] = (duplis, matrices)
+        matrices.extend(utils.luxutils.matrix_to_list(dg_obj_instance.matrix_world))
 
-def _append_matrix(matrices, prefix, matrix, step):
-    if step == 0:
-        matrices[prefix] = [matrix]
-    else:
-        matrices[prefix].append(matrix)
+    def _commit(self, step, rows, values, dupli_values):
+        if rows:
+            self.matrices[rows, step] = np.asarray(values, dtype=np.float32).reshape(-1, 4, 4)
+        for duplis, matrices in dupli_values.values():
+            duplis.set_step_matrices(step, matrices)
@@ -1,12 +1,15 @@
 import bpy
-from time import time
+import numpy as np
 from .. import utils
-import array
 
+# Domain session_uid -> flat float32 buffer the grids are read into. Re-used
+# for all channels of a domain during one export, because the grids can be very
+# large. The exporter calls free_buffers() when the grids were copied into the
+# properties, so the buffers do not outlive the export.
+_grid_buffers = {}
 
-def convert(smoke_obj, channel, depsgraph):
-    start = time()
 
+def convert(smoke_obj, channel, depsgraph):
     smoke_domain_mod = utils.find_smoke_domain_modifier(smoke_obj)
 
     if smoke_domain_mod is None:
@@ -35,9 +38,11 @@ def convert(smoke_obj, channel, depsgraph):
         msg = 'Object "%s": No smoke data (simulate some frames first)' % smoke_obj.name
         raise Exception(msg)
 
-    # We have to convert Blender's bpy_prop_array because it doesn't support the Python buffer interface.
-    # We use an array instead of a list here to save a lot of memory (list would use doubles instead of floats).
-    channeldata = array.array("f", grid)
+    # Blender's bpy_prop_array doesn't support the Python buffer interface, so
+    # we copy it in bulk into a float32 buffer (a list would use doubles).
+    # Note: the returned array is only valid until the next call for the same domain.
+    channeldata = _get_grid_buffer(smoke_obj.original.session_uid, len(grid))
+    grid.foreach_get(channeldata)
 
     # The smoke resolution along the x, y, z axis
     resolution = list(settings.domain_resolution)
@@ -50,6 +55,18 @@ def convert(smoke_obj, channel, depsgraph):
         if settings.use_noise:
             resolution = [res * settings.noise_scale for res in resolution]
 
-    print("conversion to array took %.3f s" % (time() - start))
-
     return resolution, channeldata
+
+
+def free_buffers():
+    _grid_buffers.clear()
+
+
+def _get_grid_buffer(domain_uid, size):
+    buffer = _grid_buffers.get(domain_uid)
+    if buffer is None or len(buffer) < size:
+        # Drop the old buffer first so we don't hold both in memory
+        _grid_buffers.pop(domain_uid, None)
+        buffer = np.empty(size, dtype=np.float32)
+        _grid_buffers[domain_uid] = buffer
+    return buffer[:size]
@@ -1,43 +1,61 @@
+from time import time
+
 _needs_reload = "bpy" in locals()
 
 import bpy
 from bpy.app.handlers import persistent
 from .. import utils
-from ..utils import node as utils_node
-from ..utils import openVDB_sequence_resolve_all
-from ..utils import clamp
 
 if _needs_reload:
     import importlib
     importlib.reload(utils)
 
-RELEVANT_NODES = {"LuxCoreNodeTexImagemap", "LuxCoreNodeTexOpenVDB", "LuxCoreNodeTexTimeInfo"}
+# Materials with nodes that change with the frame (image sequences, OpenVDB sequences, time info).
+# Registered by these nodes while they are exported, so the handler does not have to search all
+# node trees. Only the names are stored, because references to Blender data can become invalid
+# (e.g. on undo), and entries of deleted materials are dropped when the handler looks them up.
+# Consumed by the handler: the export triggered by the forced update registers the material again.
+# Cleared when a new .blend is loaded in load_post.
+frame_dependent_materials = set()
+
+# Timing counters of the handler, printed in debug mode
+handler_time = 0
+handler_calls = 0
+
+
+def register_material(material):
+    """Called by the export of frame dependent nodes, material is the one being exported (or None)"""
+    if material is None:
+        return
+    library = material.library.filepath if material.library else None
+    frame_dependent_materials.add((material.name, library))
 
-# Flags that save us from having to iterate all node trees when no related nodes are used (the common case).
-# Set in relevant node export methods, reset when new .blend is loaded in load_post.
-have_to_check_node_trees = False
 
 # Important: Since this function is executed on every frame, even milliseconds of processin time in here will
 # bring down the frame rate of animations considerably. Always assume the worst case: A big scene with many
 # materials and complex node trees, and optimize for it.
 @persistent
 def handler(scene):
-    global have_to_check_node_trees
+    global handler_time, handler_calls
 
-    if not have_to_check_node_trees or scene.render.engine != "LUXCORE":
+    if not frame_dependent_materials or scene.render.engine != "LUXCORE":
         return
 
-    found_relevant_node = False
-    for mat in bpy.data.materials:
-        if not mat.luxcore.node_tree:
-            continue
+    start = time()
+    material_keys = list(frame_dependent_materials)
+    frame_dependent_materials.clear()
 
-        if utils_node.has_nodes_multi(mat.luxcore.node_tree, RELEVANT_NODES, True):
-            found_relevant_node = True
+    for key in material_keys:
+        mat = bpy.data.materials.get(key)
+        if mat:
             # Force a viewport update
             mat.diffuse_color = mat.diffuse_color
 
-    have_to_check_node_trees = found_relevant_node
+    handler_time += time() - start
+    handler_calls += 1
+    if scene.luxcore.debug.enabled:
+        print(f"[frame_change_pre] Updated {len(material_keys)} materials, "
+              f"{handler_time / handler_calls * 1000:.3f} ms per frame on average")
 
     # TODO we are not handling area lights with image sequence textures right now
     #  because I can't think of a check with good performance in large scenes.
@@ -8,6 +8,7 @@ from bpy.app.handlers import persistent
 import pyluxcore
 from .. import utils, operators
 from ..utils import compatibility
+from ..export import smoke
 from . import frame_change_pre
 from ..utils.errorlog import LuxCoreErrorLog
 from ..operators.manual_compatibility import LUXCORE_OT_convert_to_v23
@@ -18,6 +19,7 @@ if _needs_reload:
         utils,
         operators,
         frame_change_pre,
+        smoke,
     )
     for module in modules:
         importlib.reload(module)
@@ -93,10 +95,13 @@ def handler(_):
         _init_LuxCoreOnlineLibrary()
 
     # Run converters for backwards compatibility
+    compatibility.reset()
     compatibility.run()
 
-    frame_change_pre.have_to_check_node_trees = False
+    frame_change_pre.frame_dependent_materials.clear()
     LuxCoreErrorLog.clear()
+    # Smoke grid buffers of the previous file
+    smoke.free_buffers()
 
     # After loading a .blend file, make it possible to execute the conversion operator again
     LUXCORE_OT_convert_to_v23.was_executed = False
@@ -42,6 +42,9 @@ class LuxCoreNodeTree:
         default=False,
         update=acknowledge_connection
     )
+    # Version of the backwards compatibility updates that were applied to this
+    # node tree, see utils/compatibility.py
+    compatibility_version: bpy.props.IntProperty(default=0)
 
     @classmethod
     def poll(cls, context):
@@ -297,13 +297,13 @@ class LuxCoreNodeTexOpenVDB(LuxCoreNodeTexture, bpy.types.Node):
 
                 file_path = self.get_cachefile_name(domain_eval, utils.clamp(frame, frame_start, frame_end), 0)
                 if frame_end > frame_start:
-                    frame_change_pre.have_to_check_node_trees = True
+                    frame_change_pre.register_material(exporter.exported_material)
         else:
             indexed_filepaths = utils.openVDB_sequence_resolve_all(self.file_path)
             if len(indexed_filepaths) > 1:
                 index, file_path = indexed_filepaths[utils.clamp(frame, self.first_frame, self.last_frame)-1]
                 if self.last_frame > self.first_frame:
-                    frame_change_pre.have_to_check_node_trees = True
+                    frame_change_pre.register_material(exporter.exported_material)
 
         #Get transformation of domain bounding box, local center is lower bounding box corner
         scale = domain_eval.dimensions
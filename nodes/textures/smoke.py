@@ -144,15 +144,11 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture, bpy.types.Node):
             prop = pyluxcore.Property(prefix + "data", [])
             prop.AddAllFloat(grid)
 
-        # We have to free the memory manually because the grid can be VERY large
-        # and if we don't invoke the garbage collection, we use way more RAM than necessary
-        del grid
-        import gc
-        gc.collect()
-
         props.Set(prop)
 
         elapsed_time = time() - start_time
+        if exporter and exporter.stats:
+            exporter.stats.export_time_smoke.value += elapsed_time
         print("[Node Tree: %s][Smoke Domain: %s] Smoke export of channel %s took %.3f s"
               % (self.id_data.name, self.domain.name, output_socket.name, elapsed_time))
 
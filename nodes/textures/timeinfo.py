@@ -28,7 +28,7 @@ class LuxCoreNodeTexTimeInfo(LuxCoreNodeTexture, bpy.types.Node):
 
     def sub_export(self, exporter, depsgraph, props, luxcore_name=None, output_socket=None):
         scene = depsgraph.scene_eval
-        frame_change_pre.have_to_check_node_trees = True
+        frame_change_pre.register_material(exporter.exported_material)
 
         definitions = {
             "type": "constfloat1",
@@ -89,6 +89,7 @@ classes = (
     config.LuxCoreConfigEnvLightCache,
     config.LuxCoreConfigNoiseEstimation,
     config.LuxCoreConfigImageResizePolicy,
+    config.LuxCoreConfigMeshCache,
     config.LuxCoreConfig,
     debug.LuxCoreDebugSettings,
     denoiser.LuxCoreDenoiser,
@@ -1,8 +1,44 @@
 import bpy
-from bpy.props import PointerProperty, BoolProperty
+from bpy.props import PointerProperty, BoolProperty, EnumProperty, IntProperty
 from bpy.types import PropertyGroup
 
 
+REFRESH_POLICY_ITEMS = [
+    ("EVERY", "Every Refresh", "Import the pass on every film refresh", 0),
+    ("AFTER_SAMPLES", "Once After Samples", "Import the pass on the first film refresh and once more "
+                                            "after the specified number of samples, then only when "
+                                            "the render stops", 1),
+    ("FINAL", "Only on Stop", "Only import the pass when the render stops or the film is refreshed "
+                              "manually. The pass stays empty until then", 2),
+]
+
+# Maps AOV names (lowercase FilmOutputType names) to the refresh policy property
+# responsible for them. AOVs not listed here use refresh_light.
+AOV_REFRESH_POLICY_PROPS = {
+    "rgb": "refresh_basic",
+    "rgba": "refresh_basic",
+    "alpha": "refresh_basic",
+    "depth": "refresh_basic",
+    "albedo": "refresh_basic",
+
+    "material_id": "refresh_material_object",
+    "material_id_color": "refresh_material_object",
+    "object_id": "refresh_material_object",
+
+    "position": "refresh_geometry",
+    "shading_normal": "refresh_geometry",
+    "avg_shading_normal": "refresh_geometry",
+    "geometry_normal": "refresh_geometry",
+    "uv": "refresh_geometry",
+
+    "irradiance": "refresh_render",
+    "raycount": "refresh_render",
+    "samplecount": "refresh_render",
+    "convergence": "refresh_render",
+    "noise": "refresh_render",
+}
+
+
 # Attached to view layer
 class LuxCoreAOVSettings(PropertyGroup):
     # Basic Information
@@ -102,3 +138,25 @@ class LuxCoreAOVSettings(PropertyGroup):
                        description="The noise amount per pixel. High values mean more noise, low values less noise")
     irradiance: BoolProperty(name="Irradiance", default=False,
                        description="Surface irradiance")
+
+    # Refresh policies for intermediate film refreshes of final renders.
+    # All passes are always imported when the render stops.
+    refresh_basic: EnumProperty(name="Basic", items=REFRESH_POLICY_ITEMS, default="EVERY",
+                       description="When to import the basic information AOVs")
+    refresh_material_object: EnumProperty(name="Material/Object", items=REFRESH_POLICY_ITEMS,
+                       default="AFTER_SAMPLES",
+                       description="When to import the material/object information AOVs")
+    refresh_light: EnumProperty(name="Light", items=REFRESH_POLICY_ITEMS, default="EVERY",
+                       description="When to import the light and shadow information AOVs and light groups")
+    refresh_geometry: EnumProperty(name="Geometry", items=REFRESH_POLICY_ITEMS, default="AFTER_SAMPLES",
+                       description="When to import the geometry information AOVs")
+    refresh_render: EnumProperty(name="Render", items=REFRESH_POLICY_ITEMS, default="EVERY",
+                       description="When to import the render information AOVs")
+    refresh_samples: IntProperty(name="Samples", default=16, min=1,
+                       description="Number of samples after which passes with the \"Once After Samples\" "
+                                   "policy are imported again")
+
+    def get_refresh_policy(self, aov_name):
+        """aov_name is the FilmOutputType name of the AOV, e.g. "MATERIAL_ID" """
+        prop = AOV_REFRESH_POLICY_PROPS.get(aov_name.lower(), "refresh_light")
+        return getattr(self, prop)
@@ -176,6 +176,13 @@ FIXED_DESC = (
     "All images are scaled the same amount (set with the Scale parameter)"
 )
 
+MESH_CACHE_DESC = (
+    "Store the data extracted from meshes on disk and re-use it in later renders and frames "
+    "if the mesh and its modifiers did not change. Meshes with modifiers that depend on other "
+    "objects, textures or geometry nodes are not cached. \n"
+    "Only used during final render"
+)
+
 
 class LuxCoreConfigPath(PropertyGroup):
     """
@@ -402,6 +409,16 @@ class LuxCoreConfigImageResizePolicy(PropertyGroup):
         return utils.luxutils.create_props(prefix, definitions)
 
 
+class LuxCoreConfigMeshCache(PropertyGroup):
+    enabled: BoolProperty(name="", default=False, description=MESH_CACHE_DESC)
+    directory: StringProperty(name="Directory", subtype="DIR_PATH",
+                              description="Where to store the cached meshes. "
+                                          "If empty, a directory in the user extension folder is used")
+    max_size: IntProperty(name="Max. Size (MiB)", default=4096, min=1,
+                          description="When the cache gets larger than this, the least recently used "
+                                      "meshes are deleted from it")
+
+
 class LuxCoreConfig(PropertyGroup):
     """
     Main config storage class.
@@ -542,6 +559,8 @@ class LuxCoreConfig(PropertyGroup):
     photongi: PointerProperty(type=LuxCoreConfigPhotonGI)
     # Special properties of the env. light cache (aka automatic portals)
     envlight_cache: PointerProperty(type=LuxCoreConfigEnvLightCache)
+    # Persistent cache of exported mesh data
+    mesh_cache: PointerProperty(type=LuxCoreConfigMeshCache)
 
     # FILESAVER options
     use_filesaver: BoolProperty(name="Only write LuxCore scene", default=False)
@@ -571,6 +590,17 @@ class LuxCoreConfig(PropertyGroup):
 
     image_resize_policy: PointerProperty(type=LuxCoreConfigImageResizePolicy)
 
+    instancing_chunk_size: IntProperty(name="Instancing Chunk Size", default=1000000, min=0,
+                                       description="Number of instances per object that are collected before "
+                                                   "they are handed to LuxCore during export. Lower values "
+                                                   "reduce the memory usage of scenes with many instances. "
+                                                   "0 to collect all instances before handing them to LuxCore "
+                                                   "(always the case with object motion blur)")
+    weld_vertices: BoolProperty(name="Weld Vertices", default=False,
+                                description="Merge the face corners of exported meshes that share the vertex, "
+                                            "normal, UVs and vertex colors. Reduces the memory usage of "
+                                            "smooth meshes in LuxCore, but makes the export slower")
+
     def using_only_lighttracing(self):
         return (self.engine == "PATH" and self.device == "CPU" and self.path.hybridbackforward_enable
                 and self.path.hybridbackforward_lightpartition == 100)
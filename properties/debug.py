@@ -10,3 +10,8 @@ class LuxCoreDebugSettings(bpy.types.PropertyGroup):
                                               "If the problem shows up in this mode, it is most "
                                               "likely a bug in LuxCore and not an OpenCL compiler bug")
     print_properties: BoolProperty(name="Print Properties", default=False)
+    profile_export: BoolProperty(name="Profile Export", default=False,
+                                 description="Record the time spent exporting each part of the scene in final "
+                                             "renders. The trace is written as JSON file next to the render output "
+                                             "(open it in chrome://tracing or ui.perfetto.dev), the slowest objects "
+                                             "are shown in the statistics of the image editor")
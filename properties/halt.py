@@ -38,33 +38,42 @@ NOISE_THRESH_STEP_DESC = (
     "your scene renders very slowly, and higher values if it renders very fast"
 )
 
+# Incremented by the update callbacks of the halt conditions, so a running
+# final render only has to convert and parse them after an edit
+edit_count = 0
+
+
+def update_edit_count(self, context):
+    global edit_count
+    edit_count += 1
+
 
 # Attached to view layer and scene
 class LuxCoreHaltConditions(bpy.types.PropertyGroup):
-    enable: BoolProperty(name="Enable", default=False)
+    enable: BoolProperty(name="Enable", default=False, update=update_edit_count)
 
-    use_time: BoolProperty(name="Use Time", default=False)
-    time: IntProperty(name="Time (s)", default=600, min=1)
+    use_time: BoolProperty(name="Use Time", default=False, update=update_edit_count)
+    time: IntProperty(name="Time (s)", default=600, min=1, update=update_edit_count)
 
     use_samples: BoolProperty(name="Use Samples", default=True,
-                               description=USE_SAMPLES_DESC)
+                               description=USE_SAMPLES_DESC, update=update_edit_count)
     samples: IntProperty(name="Samples", default=32, min=2, soft_max=16384, 
-                          description=SAMPLES_DESC)
+                          description=SAMPLES_DESC, update=update_edit_count)
 
     use_light_samples: BoolProperty(name="Use Light Path Samples", default=False,
-                                     description=USE_LIGHT_PATH_SAMPLES_DESC)
+                                     description=USE_LIGHT_PATH_SAMPLES_DESC, update=update_edit_count)
     light_samples: IntProperty(name="Light Path Samples", default=100, min=1,
-                                description=LIGHT_PATH_SAMPLES_DESC)
+                                description=LIGHT_PATH_SAMPLES_DESC, update=update_edit_count)
 
     # Noise threshold
     use_noise_thresh: BoolProperty(name="Use Noise Threshold", default=False,
-                                    description=USE_NOISE_THRESH_DESC)
+                                    description=USE_NOISE_THRESH_DESC, update=update_edit_count)
     noise_thresh: IntProperty(name="Noise Threshold", default=5, min=0, soft_min=3, max=255,
-                               description=NOISE_THRESH_DESC)
+                               description=NOISE_THRESH_DESC, update=update_edit_count)
     noise_thresh_warmup: IntProperty(name="Warmup Samples", default=64, min=1,
-                                      description=NOISE_THRESH_WARMUP_DESC)
+                                      description=NOISE_THRESH_WARMUP_DESC, update=update_edit_count)
     noise_thresh_step: IntProperty(name="Test Step Samples", default=64, min=1, soft_min=16,
-                                    description=NOISE_THRESH_STEP_DESC)
+                                    description=NOISE_THRESH_STEP_DESC, update=update_edit_count)
 
     def is_enabled(self):
         return self.enable and (self.use_time or self.use_samples or self.use_noise_thresh)
@@ -11,6 +11,16 @@ from bpy.types import PropertyGroup, Image
 from .light import GAMMA_DESCRIPTION
 from .image_user import LuxCoreImageUser
 
+# Incremented by the update callbacks of all settings that end up in the
+# imagepipeline (including the light group gains), so a running final render
+# only has to convert and parse the imagepipeline after an edit
+edit_count = 0
+
+
+def update_edit_count(self, context):
+    global edit_count
+    edit_count += 1
+
 
 class LuxCoreImagepipelinePluginMixin:
 
@@ -34,7 +44,10 @@ class LuxCoreImagepipelineTonemapper(
 ):
     NAME = "Tonemapper"
     enabled: BoolProperty(
-        name=NAME, default=True, description="Enable/disable " + NAME
+        name=NAME,
+        default=True,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -75,6 +88,7 @@ class LuxCoreImagepipelineTonemapper(
         items=type_items,
         default="TONEMAP_LINEAR",
         description="The tonemapper converts the image from HDR to LDR",
+        update=update_edit_count,
     )
 
     # Settings for TONEMAP_LINEAR
@@ -82,6 +96,7 @@ class LuxCoreImagepipelineTonemapper(
         name="Auto Brightness",
         default=False,
         description="Auto-detect the optimal image brightness",
+        update=update_edit_count,
     )
     linear_scale: FloatProperty(
         name="Gain",
@@ -91,14 +106,23 @@ class LuxCoreImagepipelineTonemapper(
         soft_max=100,
         precision=5,
         description="Image brightness is multiplied with this value",
+        update=update_edit_count,
     )
 
     # Settings for TONEMAP_LUXLINEAR (camera settings)
     fstop: FloatProperty(
-        name="F-stop", default=2.8, min=0.01, description=FSTOP_DESC
+        name="F-stop",
+        default=2.8,
+        min=0.01,
+        description=FSTOP_DESC,
+        update=update_edit_count,
     )
     exposure: FloatProperty(
-        name="Shutter (s)", default=1 / 100, min=0, description=EXPOSURE_DESC
+        name="Shutter (s)",
+        default=1 / 100,
+        min=0,
+        description=EXPOSURE_DESC,
+        update=update_edit_count,
     )
     sensitivity: FloatProperty(
         name="ISO",
@@ -106,6 +130,7 @@ class LuxCoreImagepipelineTonemapper(
         min=0,
         soft_max=6400,
         description=SENSITIVITY_DESC,
+        update=update_edit_count,
     )
 
     # Settings for TONEMAP_REINHARD02
@@ -115,6 +140,7 @@ class LuxCoreImagepipelineTonemapper(
         min=0,
         max=25,
         description=REINHARD_PRESCALE_DESC,
+        update=update_edit_count,
     )
     reinhard_postscale: FloatProperty(
         name="Post",
@@ -122,6 +148,7 @@ class LuxCoreImagepipelineTonemapper(
         min=0,
         max=25,
         description=REINHARD_POSTSCALE_DESC,
+        update=update_edit_count,
     )
     reinhard_burn: FloatProperty(
         name="Burn",
@@ -129,6 +156,7 @@ class LuxCoreImagepipelineTonemapper(
         min=0.01,
         max=25,
         description=REINHARD_BURN_DESC,
+        update=update_edit_count,
     )
 
     def is_automatic(self):
@@ -143,7 +171,10 @@ class LuxCoreImagepipelineBloom(
 ):
     NAME = "Bloom"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -155,6 +186,7 @@ class LuxCoreImagepipelineBloom(
         precision=1,
         subtype="PERCENTAGE",
         description="Size of the bloom effect (percent of the image size)",
+        update=update_edit_count,
     )
     weight: FloatProperty(
         name="Strength",
@@ -164,20 +196,29 @@ class LuxCoreImagepipelineBloom(
         precision=1,
         subtype="PERCENTAGE",
         description="Strength of the bloom effect (a linear mix factor)",
+        update=update_edit_count,
     )
 
 
 class LuxCoreImagepipelineMist(PropertyGroup, LuxCoreImagepipelinePluginMixin):
     NAME = "Mist"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
     EXCLUDE_BACKGROUND_DESC = "Disable mist over background parts of the image (where distance = infinity)"
 
     color: FloatVectorProperty(
-        name="Color", default=(0.3, 0.4, 0.55), min=0, max=1, subtype="COLOR"
+        name="Color",
+        default=(0.3, 0.4, 0.55),
+        min=0,
+        max=1,
+        subtype="COLOR",
+        update=update_edit_count,
     )
     amount: FloatProperty(
         name="Strength",
@@ -187,6 +228,7 @@ class LuxCoreImagepipelineMist(PropertyGroup, LuxCoreImagepipelinePluginMixin):
         precision=1,
         subtype="PERCENTAGE",
         description="Strength of the mist overlay",
+        update=update_edit_count,
     )
     start_distance: FloatProperty(
         name="Start",
@@ -194,6 +236,7 @@ class LuxCoreImagepipelineMist(PropertyGroup, LuxCoreImagepipelinePluginMixin):
         min=0,
         subtype="DISTANCE",
         description="Distance from the camera where the mist starts to be visible",
+        update=update_edit_count,
     )
     end_distance: FloatProperty(
         name="End",
@@ -201,11 +244,13 @@ class LuxCoreImagepipelineMist(PropertyGroup, LuxCoreImagepipelinePluginMixin):
         min=0,
         subtype="DISTANCE",
         description="Distance from the camera where the mist reaches full strength",
+        update=update_edit_count,
     )
     exclude_background: BoolProperty(
         name="Exclude Background",
         default=True,
         description=EXCLUDE_BACKGROUND_DESC,
+        update=update_edit_count,
     )
 
 
@@ -214,7 +259,10 @@ class LuxCoreImagepipelineVignetting(
 ):
     NAME = "Vignetting"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -227,6 +275,7 @@ class LuxCoreImagepipelineVignetting(
         precision=1,
         subtype="PERCENTAGE",
         description="Strength of the vignette",
+        update=update_edit_count,
     )
 
 
@@ -235,11 +284,14 @@ class LuxCoreImagepipelineColorAberration(
 ):
     NAME = "Color Aberration"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = False
 
-    uniform: BoolProperty(name="Uniform", default=True)
+    uniform: BoolProperty(name="Uniform", default=True, update=update_edit_count)
     amount: FloatProperty(
         name="Strength",
         default=0.5,
@@ -249,6 +301,7 @@ class LuxCoreImagepipelineColorAberration(
         precision=1,
         subtype="PERCENTAGE",
         description="Strength of the color aberration effect",
+        update=update_edit_count,
     )
     amount_y: FloatProperty(
         name="Strength (Y)",
@@ -259,6 +312,7 @@ class LuxCoreImagepipelineColorAberration(
         precision=1,
         subtype="PERCENTAGE",
         description="Strength of the color aberration effect",
+        update=update_edit_count,
     )
 
 
@@ -267,17 +321,25 @@ class LuxCoreImagepipelineBackgroundImage(
 ):
     NAME = "Background Image"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
     def update_image(self, context):
         self.image_user.update(self.image)
+        update_edit_count(self, context)
 
     image: PointerProperty(name="Image", type=Image, update=update_image)
     image_user: PointerProperty(type=LuxCoreImageUser)
     gamma: FloatProperty(
-        name="Gamma", default=2.2, min=0, description=GAMMA_DESCRIPTION
+        name="Gamma",
+        default=2.2,
+        min=0,
+        description=GAMMA_DESCRIPTION,
+        update=update_edit_count,
     )
     storage_items = [
         (
@@ -294,7 +356,12 @@ class LuxCoreImagepipelineBackgroundImage(
             1,
         ),
     ]
-    storage: EnumProperty(name="Storage", items=storage_items, default="byte")
+    storage: EnumProperty(
+        name="Storage",
+        items=storage_items,
+        default="byte",
+        update=update_edit_count,
+    )
 
 
 class LuxCoreImagepipelineWhiteBalance(
@@ -302,7 +369,10 @@ class LuxCoreImagepipelineWhiteBalance(
 ):
     NAME = "White Balance"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -312,8 +382,9 @@ class LuxCoreImagepipelineWhiteBalance(
         min=1000,
         max=10000,
         description="White point temperature",
+        update=update_edit_count,
     )
-    reverse: BoolProperty(name="Reverse", default=True)
+    reverse: BoolProperty(name="Reverse", default=True, update=update_edit_count)
 
 
 class LuxCoreImagepipelineCameraResponseFunc(
@@ -321,7 +392,10 @@ class LuxCoreImagepipelineCameraResponseFunc(
 ):
     NAME = "Analog Film Simulation"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -340,15 +414,17 @@ class LuxCoreImagepipelineCameraResponseFunc(
         items=type_items,
         default="PRESET",
         description="Source of the CRF data",
+        update=update_edit_count,
     )
 
     file: StringProperty(
         name="CRF File",
         subtype="FILE_PATH",
         description="Path to the external .crf file",
+        update=update_edit_count,
     )
     # Internal, not shown to the user (set by operator "luxcore.select_crf")
-    preset: StringProperty(name="")
+    preset: StringProperty(name="", update=update_edit_count)
 
 
 class LuxCoreImagepipelineColorLUT(
@@ -356,7 +432,10 @@ class LuxCoreImagepipelineColorLUT(
 ):
     NAME = "LUT"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = True
 
@@ -380,6 +459,7 @@ class LuxCoreImagepipelineColorLUT(
         items=input_colorspace_items,
         default="SRGB_GAMMA_CORRECTED",
         description="Choose the color space that is expected by the LUT file",
+        update=update_edit_count,
     )
 
     # TODO: Support file as Blender text block (similar to IES files)
@@ -387,6 +467,7 @@ class LuxCoreImagepipelineColorLUT(
         name="CUBE File",
         subtype="FILE_PATH",
         description="Path to the .cube file",
+        update=update_edit_count,
     )
 
     strength: FloatProperty(
@@ -397,6 +478,7 @@ class LuxCoreImagepipelineColorLUT(
         precision=1,
         subtype="PERCENTAGE",
         description="Mix between input without LUT and result with LUT",
+        update=update_edit_count,
     )
 
 
@@ -405,7 +487,10 @@ class LuxCoreImagepipelineContourLines(
 ):
     NAME = "Irradiance Contour Lines"
     enabled: BoolProperty(
-        name=NAME, default=False, description="Enable/disable " + NAME
+        name=NAME,
+        default=False,
+        description="Enable/disable " + NAME,
+        update=update_edit_count,
     )
     compatible_with_viewport_denoising = False
 
@@ -415,12 +500,15 @@ class LuxCoreImagepipelineContourLines(
         "(-1 => no grid, 0 => all black, >0 => size of the black grid)"
     )
 
-    scale: FloatProperty(name="Scale", default=179, min=0, soft_max=1000)
+    scale: FloatProperty(
+        name="Scale", default=179, min=0, soft_max=1000, update=update_edit_count
+    )
     contour_range: FloatProperty(
         name="Range",
         default=100,
         soft_max=1000,
         description="Max range of irradiance values (unit: lux), minimum is always 0",
+        update=update_edit_count,
     )
     steps: IntProperty(
         name="Steps",
@@ -429,6 +517,7 @@ class LuxCoreImagepipelineContourLines(
         soft_min=2,
         soft_max=50,
         description="Number of steps to draw in interval range",
+        update=update_edit_count,
     )
     zero_grid_size: IntProperty(
         name="Grid Size",
@@ -436,6 +525,7 @@ class LuxCoreImagepipelineContourLines(
         min=-1,
         soft_max=20,
         description=ZERO_GRID_SIZE_DESC,
+        update=update_edit_count,
     )
 
 
@@ -449,6 +539,7 @@ class LuxCoreImagepipeline(PropertyGroup):
         name="Transparent Film",
         default=False,
         description="Make the world background transparent",
+        update=update_edit_count,
     )
 
     tonemapper: PointerProperty(type=LuxCoreImagepipelineTonemapper)
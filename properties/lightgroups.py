@@ -5,6 +5,7 @@ from bpy.props import (
 )
 from bpy.types import PropertyGroup
 from ..utils import node as utils_node
+from .imagepipeline import update_edit_count as update_imagepipeline
 
 import re
 
@@ -74,16 +75,17 @@ class LuxCoreLightGroup(PropertyGroup):
     # These settings are no longer used, TODO: remove?
     enabled: BoolProperty(default=True, name="Enabled",
                           description="Enable/disable this light group. If disabled, all lights "
-                                      "in this group are off. Does not affect this lightgroup's AOV")
+                                      "in this group are off. Does not affect this lightgroup's AOV",
+                          update=update_imagepipeline)
     show_settings: BoolProperty(default=True)
-    gain: FloatProperty(name="Gain", default=1, min=0, description="Brightness multiplier")
-    use_rgb_gain: BoolProperty(name="Color:", default=True, description="Use RGB color multiplier")
+    gain: FloatProperty(name="Gain", default=1, min=0, description="Brightness multiplier", update=update_imagepipeline)
+    use_rgb_gain: BoolProperty(name="Color:", default=True, description="Use RGB color multiplier", update=update_imagepipeline)
     rgb_gain: FloatVectorProperty(name="", default=(1, 1, 1), min=0, max=1, subtype="COLOR",
-                                   description=RGB_GAIN_DESC)
+                                   description=RGB_GAIN_DESC, update=update_imagepipeline)
     use_temperature: BoolProperty(name="Temperature:", default=False,
-                                   description="Use temperature multiplier")
+                                   description="Use temperature multiplier", update=update_imagepipeline)
     temperature: FloatProperty(name="Kelvin", default=4000, min=1000, max=10000, precision=0,
-                                description=TEMP_DESC)
+                                description=TEMP_DESC, update=update_imagepipeline)
 
 
 # Attached to scene
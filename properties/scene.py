@@ -19,6 +19,9 @@ class LuxCoreScene(bpy.types.PropertyGroup):
     viewport: PointerProperty(type=viewport.LuxCoreViewportSettings)
     statistics: PointerProperty(type=statistics.LuxCoreRenderStatsCollection)
     debug: PointerProperty(type=debug.LuxCoreDebugSettings)
+    # Version of the backwards compatibility updates that were applied to this
+    # scene, see utils/compatibility.py
+    compatibility_version: IntProperty(default=0)
 
     @classmethod
     def register(cls):
@@ -15,6 +15,7 @@ from ..utils.statistics import (
     smaller_is_better,
     time_to_string,
     triangle_count_to_string,
+    vertex_welding_to_string,
     vram_better,
     vram_usage_to_string,
 )
@@ -40,12 +41,23 @@ class LuxCoreRenderStats:
                                 0, smaller_is_better, time_to_string, get_rounded)
         self.export_time_meshes = Stat("    Mesh Export Time", categories[-1],
                                        0, smaller_is_better, time_to_string, get_rounded)
+        self.mesh_cache_hits = Stat("    Mesh Cache Hits", categories[-1], 0)
+        self.mesh_cache_misses = Stat("    Mesh Cache Misses", categories[-1], 0)
+        self.vertex_welding = Stat("    Vertex Welding", categories[-1], (0, 0),
+                                   string_func=vertex_welding_to_string)
         self.export_time_hair = Stat("    Hair Export Time", categories[-1],
                                      0, smaller_is_better, time_to_string, get_rounded)
+        self.export_time_smoke = Stat("    Smoke Export Time", categories[-1],
+                                      0, smaller_is_better, time_to_string, get_rounded)
         self.export_time_instancing = Stat("    Instancing Time", categories[-1],
                                            0, smaller_is_better, time_to_string, get_rounded)
+        self.instances_per_sec = Stat("    Instances/Sec", categories[-1],
+                                      0, greater_is_better, samples_per_sec_to_string, get_rounded)
         self.session_init_time = Stat("Session Init Time", categories[-1],
                                       0, smaller_is_better, time_to_string, get_rounded)
+        # List of (obj_name, seconds) tuples, only filled if the export was profiled.
+        # Not part of the categories, it is drawn as separate table.
+        self.slowest_objects = Stat("Slowest Objects", "Profiler", tuple())
         categories.append("Scene")
         self.light_count = Stat("Lights", categories[-1], 0)
         self.triangle_count = Stat("Triangles", categories[-1], 0, string_func=triangle_count_to_string)
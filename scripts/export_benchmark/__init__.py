@@ -0,0 +1,7 @@
+"""
+Headless export benchmark for BlendLuxCore.
+
+Builds synthetic stress scenes and times the export, see README.md for usage.
+The modules are imported by run.py, which is executed by Blender with
+blender --background --python scripts/export_benchmark/run.py -- [options]
+"""
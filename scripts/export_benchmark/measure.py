@@ -0,0 +1,240 @@
+"""
+Timing of the export entry points. All functions return JSON-serializable dicts,
+durations are in seconds.
+"""
+
+import gc
+import importlib
+import os
+import statistics
+from time import perf_counter
+from types import SimpleNamespace
+
+import bpy
+import numpy as np
+
+
+def summarize(durations):
+    return {
+        "runs": durations,
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "max": max(durations),
+    }
+
+
+def get_rss():
+    """Resident set size of the process in bytes, None if unknown (only implemented for Linux)"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _stats_to_dict(stats):
+    return {stat.name.strip(): stat.value for stat in stats.to_list()}
+
+
+def time_create_session(addon, repeat):
+    """Final render export with a fresh Exporter per run, the session is not started"""
+    export = addon.export
+    render_stats = importlib.import_module(addon.__name__ + ".properties.statistics")
+    durations = []
+    stats = None
+
+    for _ in range(repeat):
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        view_layer = depsgraph.view_layer_eval
+        addon.utils.view_layer.State.active_view_layer = view_layer.name
+        stats = render_stats.LuxCoreRenderStats()
+        exporter = export.Exporter(stats)
+
+        start = perf_counter()
+        session = exporter.create_session(depsgraph, view_layer=view_layer)
+        durations.append(perf_counter() - start)
+
+        if session is None:
+            raise RuntimeError("create_session() returned no session")
+        del session
+        del exporter
+        gc.collect()
+
+    result = summarize(durations)
+    result["stats"] = _stats_to_dict(stats)
+    return result
+
+
+def _move_object(obj):
+    obj.location.x += 0.01
+
+
+def _edit_mesh(obj):
+    vertex = obj.data.vertices[0]
+    vertex.co.z += 0.001
+    obj.data.update()
+
+
+VIEWPORT_EDITS = {
+    "move_object": _move_object,
+    "edit_mesh": _edit_mesh,
+}
+
+
+def time_viewport_updates(addon, edit_object_name, repeat):
+    """
+    Export the scene like a viewport render would, then time ObjectCache2.update()
+    for typical edits. The updates are applied in a depsgraph_update_post handler,
+    because depsgraph.updates is only valid there.
+    """
+    import pyluxcore
+
+    export = addon.export
+    # There is no 3D viewport in background mode, see utils.is_visible_in_viewport()
+    context = SimpleNamespace(
+        scene=bpy.context.scene,
+        view_layer=bpy.context.view_layer,
+        space_data=None,
+        region_data=None,
+    )
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    exporter = export.Exporter()
+    exporter.scene = depsgraph.scene_eval
+    luxcore_scene = pyluxcore.Scene()
+    scene_props = pyluxcore.Properties()
+
+    start = perf_counter()
+    instances = exporter.object_cache2.first_run(
+        exporter,
+        depsgraph,
+        depsgraph.view_layer_eval,
+        None,
+        luxcore_scene,
+        scene_props,
+        context,
+    )
+    luxcore_scene.Parse(scene_props)
+    exporter.object_cache2.duplicate_instances(instances, luxcore_scene, None)
+    results = {"initial_export": perf_counter() - start}
+
+    durations = []
+
+    def handler(scene, depsgraph):
+        props = pyluxcore.Properties()
+        start = perf_counter()
+        exporter.object_cache2.update(
+            exporter, depsgraph, luxcore_scene, props, context
+        )
+        luxcore_scene.Parse(props)
+        durations.append(perf_counter() - start)
+
+    obj = bpy.data.objects[edit_object_name]
+    bpy.app.handlers.depsgraph_update_post.append(handler)
+    try:
+        for edit_name, edit in VIEWPORT_EDITS.items():
+            durations.clear()
+            for _ in range(repeat):
+                edit(obj)
+                bpy.context.view_layer.update()
+
+            if durations:
+                results[edit_name] = summarize(list(durations))
+            else:
+                results[edit_name] = {"error": "depsgraph_update_post was not called"}
+    finally:
+        bpy.app.handlers.depsgraph_update_post.remove(handler)
+
+    return results
+
+
+def time_film_draw(addon, samples):
+    """
+    Render until the halt condition is reached and time every FrameBufferFinal.draw()
+    call. The engine can only be instantiated by Blender, so the method is wrapped
+    for the duration of the render.
+    """
+    framebuffer_class = importlib.import_module(addon.__name__ + ".draw.final").FrameBufferFinal
+    original_draw = framebuffer_class.draw
+    durations = []
+    final_durations = []
+
+    def timed_draw(self, engine, session, scene, render_stopped):
+        start = perf_counter()
+        original_draw(self, engine, session, scene, render_stopped)
+        (final_durations if render_stopped else durations).append(perf_counter() - start)
+
+    scene = bpy.context.scene
+    scene.luxcore.halt.enable = True
+    scene.luxcore.halt.use_samples = True
+    scene.luxcore.halt.samples = samples
+
+    framebuffer_class.draw = timed_draw
+    try:
+        bpy.ops.render.render()
+    finally:
+        framebuffer_class.draw = original_draw
+
+    result = {
+        "resolution": [scene.render.resolution_x, scene.render.resolution_y],
+        "samples": samples,
+        "final_draw": final_durations[0] if final_durations else None,
+    }
+    if durations:
+        result["draw"] = summarize(durations)
+    return result
+
+
+def time_mesh_normals(addon, obj_name, repeat):
+    """
+    Compare the mesh extraction with split_faces() and vertex normals (the fallback)
+    to the extraction of Mesh.corner_normals from the unmodified mesh.
+    The peak memory is the largest increase of the resident set size, sampled after
+    preparing, extracting and gathering the mesh.
+    """
+    mesh_converter = addon.export.mesh_converter
+    obj = bpy.data.objects[obj_name]
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    # Name -> (split_faces, use_corner_normals)
+    paths = {"split_faces": (True, False)}
+    if mesh_converter.USE_CORNER_NORMALS:
+        paths["corner_normals"] = (False, True)
+
+    results = {}
+    outputs = {}
+
+    for name, (split_faces, use_corner_normals) in paths.items():
+        durations = []
+        peaks = []
+
+        for _ in range(repeat):
+            outputs.pop(name, None)
+            gc.collect()
+            baseline = get_rss()
+            samples = []
+
+            start = perf_counter()
+            with mesh_converter._prepare_mesh(obj, depsgraph, split_faces) as mesh:
+                samples.append(get_rss())
+                raw_mesh_data = mesh_converter.extract(mesh, use_corner_normals)
+                samples.append(get_rss())
+            mesh_data = mesh_converter.gather(raw_mesh_data)
+            durations.append(perf_counter() - start)
+            samples.append(get_rss())
+
+            if baseline is not None:
+                peaks.append(max(samples) - baseline)
+            outputs[name] = mesh_data
+            del raw_mesh_data
+
+        results[name] = summarize(durations)
+        results[name]["peak_memory_bytes"] = summarize(peaks) if peaks else None
+
+    if len(outputs) == 2:
+        split, corner = outputs["split_faces"], outputs["corner_normals"]
+        # split_faces() keeps the order of the face corners, so the arrays are comparable
+        if np.array_equal(split.loop_points, corner.loop_points):
+            difference = np.abs(split.loop_normals - corner.loop_normals).max()
+            results["max_normal_difference"] = float(difference)
+    return results
@@ -0,0 +1,174 @@
+"""
+Entry point of the export benchmark, run it with
+
+blender --background --python scripts/export_benchmark/run.py -- [options]
+
+See README.md or the --help output for the options.
+"""
+
+import argparse
+import datetime
+import importlib
+from importlib.metadata import version
+import json
+import os
+import platform
+import subprocess
+import sys
+import traceback
+from time import perf_counter
+
+import addon_utils
+import bpy
+
+# Blender runs this file as a script, so the package is not importable by default
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from export_benchmark import measure, scenes
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog="blender --background --python scripts/export_benchmark/run.py --",
+        description="Time the BlendLuxCore export of synthetic stress scenes",
+    )
+    parser.add_argument("--output", help="JSON file to write, default: print to stdout")
+    parser.add_argument("--scenes", nargs="+", choices=list(scenes.SCENES), default=list(scenes.SCENES),
+                        help="Scenes to benchmark, default: all")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplier for the object/instance/strand counts of all scenes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--no-viewport", action="store_true",
+                        help="Skip the viewport update timings")
+    parser.add_argument("--no-film", action="store_true",
+                        help="Skip the render that times FrameBufferFinal.draw()")
+    parser.add_argument("--no-mesh-normals", action="store_true",
+                        help="Skip the comparison of the mesh normals export paths")
+    parser.add_argument("--film-resolution", default="1920x1080",
+                        help="Resolution of the film benchmark, as WIDTHxHEIGHT")
+    parser.add_argument("--film-samples", type=int, default=8,
+                        help="Halt condition of the film benchmark")
+    parser.add_argument("--addon", help="Module name of BlendLuxCore, default: the add-on "
+                                        "installed from this repository")
+    return parser.parse_args(argv)
+
+
+def enable_addon(module_name=None):
+    """Enable BlendLuxCore and return its root module"""
+    if module_name is None:
+        for module in addon_utils.modules(refresh=True):
+            module_dir = os.path.dirname(os.path.realpath(module.__file__))
+            if module_dir == os.path.realpath(REPO_DIR):
+                module_name = module.__name__
+                break
+        else:
+            raise RuntimeError(
+                f'BlendLuxCore from "{REPO_DIR}" is not installed in this Blender. '
+                "Link the repository into the add-on/extension directory or pass --addon"
+            )
+
+    addon_utils.enable(module_name, default_set=True)
+    return importlib.import_module(module_name)
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scene(addon, name, args):
+    result = {"scene": name}
+    try:
+        start = perf_counter()
+        scenes.reset_scene()
+        info = scenes.SCENES[name](addon, args.scale)
+        result["params"] = info.params
+        result["build_time"] = perf_counter() - start
+
+        result["create_session"] = measure.time_create_session(addon, args.repeat)
+
+        if info.edit_object and not args.no_viewport:
+            result["viewport_update"] = measure.time_viewport_updates(
+                addon, info.edit_object, args.repeat
+            )
+    except Exception as error:
+        traceback.print_exc()
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def run_mesh_normals(addon, args):
+    result = {"scene": "mesh_normals"}
+    try:
+        scenes.reset_scene()
+        info = scenes.build_dense_mesh(addon, args.scale)
+        result["params"] = info.params
+        result["mesh_normals"] = measure.time_mesh_normals(
+            addon, info.edit_object, args.repeat
+        )
+    except Exception as error:
+        traceback.print_exc()
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def run_film(addon, args):
+    result = {"scene": "film"}
+    try:
+        width, height = (int(value) for value in args.film_resolution.lower().split("x"))
+        scenes.build_film_scene(addon, (width, height))
+        result["film_draw"] = measure.time_film_draw(addon, args.film_samples)
+    except Exception as error:
+        traceback.print_exc()
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon(args.addon)
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "blender_version": bpy.app.version_string,
+        "blendluxcore_version": addon.utils.get_version_string(),
+        "pyluxcore_version": version("pyluxcore"),
+        "git_commit": get_git_commit(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "results": [],
+    }
+
+    for name in args.scenes:
+        print(f"[Benchmark] Scene {name}")
+        report["results"].append(run_scene(addon, name, args))
+    if not args.no_mesh_normals:
+        print("[Benchmark] Mesh normals")
+        report["results"].append(run_mesh_normals(addon, args))
+    if not args.no_film:
+        print("[Benchmark] Film draw")
+        report["results"].append(run_film(addon, args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+        print(f'[Benchmark] Results written to "{args.output}"')
+    else:
+        print(output)
+
+    # Non-zero exit code for CI if a scene failed
+    if any("error" in result for result in report["results"]):
+        sys.exit(1)
+
+
+main()
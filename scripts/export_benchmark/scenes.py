@@ -0,0 +1,305 @@
+"""
+Procedural stress scenes. Each builder starts from an empty file and returns a
+SceneInfo. All object counts are multiplied by the --scale argument, so the
+same scenes can be used for quick checks and for the full benchmark.
+"""
+
+import math
+import tempfile
+
+import bmesh
+import bpy
+import numpy as np
+
+
+class SceneInfo:
+    def __init__(self, params, edit_object=None):
+        # Written into the JSON output, so results of different builds can be matched
+        self.params = params
+        # Name of the object that is modified for the viewport update timings,
+        # None if the scene is too heavy for a viewport export
+        self.edit_object = edit_object
+
+
+def _scaled(count, scale, minimum=1):
+    return max(minimum, int(count * scale))
+
+
+def reset_scene(resolution=(1280, 720)):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    scene = bpy.context.scene
+    scene.render.engine = "LUXCORE"
+    scene.render.resolution_x, scene.render.resolution_y = resolution
+    scene.render.resolution_percentage = 100
+    # The denoiser imagepipeline is registered in the RenderEngine, which
+    # create_session() does not get in the benchmark
+    scene.luxcore.denoiser.enabled = False
+
+    camera = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+    camera.location = (0, -60, 40)
+    camera.rotation_euler = (math.radians(55), 0, 0)
+    scene.collection.objects.link(camera)
+    scene.camera = camera
+
+    sun = bpy.data.objects.new("Sun", bpy.data.lights.new("Sun", "SUN"))
+    scene.collection.objects.link(sun)
+    return scene
+
+
+def _link(obj):
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+
+def _ico_sphere_mesh(name, subdivisions, radius=1):
+    bm = bmesh.new()
+    bmesh.ops.create_icosphere(bm, subdivisions=subdivisions, radius=radius)
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def _grid_mesh(name, segments, size):
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=segments, y_segments=segments, size=size)
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def _find_node(node_tree, bl_idname):
+    return next(node for node in node_tree.nodes if node.bl_idname == bl_idname)
+
+
+def _matte_material(addon, name):
+    material = bpy.data.materials.new(name)
+    node_tree = bpy.data.node_groups.new("Nodes_" + name, "luxcore_material_nodes")
+    addon.operators.utils.init_mat_node_tree(node_tree)
+    material.luxcore.node_tree = node_tree
+    return material
+
+
+def build_unique_meshes(addon, scale):
+    """Many objects that each have their own mesh datablock (no instancing)"""
+    count = _scaled(5000, scale)
+    template = _ico_sphere_mesh("UniqueMesh", subdivisions=3)
+    template.materials.append(_matte_material(addon, "Shared"))
+    side = math.ceil(math.sqrt(count))
+
+    for i in range(count):
+        obj = _link(bpy.data.objects.new("Unique.%06d" % i, template.copy()))
+        obj.location = ((i % side) * 2.5, (i // side) * 2.5, 0)
+
+    bpy.data.meshes.remove(template)
+    return SceneInfo({"objects": count}, edit_object="Unique.000000")
+
+
+def build_material_slots(addon, scale):
+    """One dense mesh with many material slots, so it is split into many submeshes"""
+    slots = 256
+    segments = _scaled(512, math.sqrt(scale), minimum=32)
+    mesh = _grid_mesh("SlotsMesh", segments, size=20)
+
+    for i in range(slots):
+        mesh.materials.append(_matte_material(addon, "Slot.%03d" % i))
+    material_indices = np.arange(len(mesh.polygons), dtype=np.int32) % slots
+    mesh.polygons.foreach_set("material_index", material_indices)
+    mesh.update()
+
+    _link(bpy.data.objects.new("Slots", mesh))
+    return SceneInfo(
+        {"material_slots": slots, "faces": len(mesh.polygons)}, edit_object="Slots"
+    )
+
+
+def build_instances(addon, scale):
+    """Vertex instancing of one small mesh, exported through the Duplis code path"""
+    count = _scaled(10_000_000, scale)
+    points = bpy.data.meshes.new("InstancerPoints")
+    points.vertices.add(count)
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(-500, 500, (count, 3)).astype(np.float32)
+    points.vertices.foreach_set("co", coords.ravel())
+    points.update()
+
+    instancer = _link(bpy.data.objects.new("Instancer", points))
+    instancer.instance_type = "VERTS"
+
+    instanced_mesh = _ico_sphere_mesh("InstancedMesh", subdivisions=1, radius=0.2)
+    instanced_mesh.materials.append(_matte_material(addon, "Instanced"))
+    instanced = _link(bpy.data.objects.new("Instanced", instanced_mesh))
+    instanced.parent = instancer
+    return SceneInfo({"instances": count})
+
+
+def build_hair(addon, scale):
+    """A particle hair system with interpolated children, exported with convert_hair()"""
+    parents = _scaled(10_000, scale)
+    children = 20
+
+    emitter_mesh = _ico_sphere_mesh("HairEmitter", subdivisions=4, radius=5)
+    emitter_mesh.materials.append(_matte_material(addon, "Hair"))
+    emitter = _link(bpy.data.objects.new("HairEmitter", emitter_mesh))
+    emitter.modifiers.new("Hair", "PARTICLE_SYSTEM")
+
+    settings = emitter.particle_systems[0].settings
+    settings.type = "HAIR"
+    settings.count = parents
+    settings.hair_length = 1
+    settings.child_type = "INTERPOLATED"
+    settings.rendered_child_count = children
+    # The benchmark uses the viewport depsgraph, so the display settings have to match
+    settings.child_percent = children
+    settings.display_step = settings.render_step
+    return SceneInfo({"parents": parents, "strands": parents * (1 + children)})
+
+
+def build_smoke(addon, scale):
+    """A gas simulation domain, its grids are exported by the smoke texture node"""
+    resolution = _scaled(192, scale ** (1 / 3), minimum=16)
+    frames = 10
+    scene = bpy.context.scene
+
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=8)
+    domain_mesh = bpy.data.meshes.new("SmokeDomain")
+    bm.to_mesh(domain_mesh)
+    bm.free()
+    domain = _link(bpy.data.objects.new("SmokeDomain", domain_mesh))
+    domain_modifier = domain.modifiers.new("Fluid", "FLUID")
+    domain_modifier.fluid_type = "DOMAIN"
+    domain_settings = domain_modifier.domain_settings
+    domain_settings.domain_type = "GAS"
+    domain_settings.resolution_max = resolution
+    domain_settings.cache_directory = tempfile.mkdtemp(prefix="blc_benchmark_smoke_")
+    domain_settings.cache_frame_end = frames
+
+    flow = _link(bpy.data.objects.new("SmokeFlow", _ico_sphere_mesh("SmokeFlow", 2)))
+    flow.location = (0, 0, -2)
+    flow_modifier = flow.modifiers.new("Fluid", "FLUID")
+    flow_modifier.fluid_type = "FLOW"
+    flow_modifier.flow_settings.flow_type = "SMOKE"
+    flow_modifier.flow_settings.flow_behavior = "INFLOW"
+    flow.hide_render = True
+
+    # Same node setup as the "Smoke" material preset
+    vol_tree = bpy.data.node_groups.new("Smoke Volume", "luxcore_volume_nodes")
+    vol_output = vol_tree.nodes.new("LuxCoreNodeVolOutput")
+    heterogeneous = vol_tree.nodes.new("LuxCoreNodeVolHeterogeneous")
+    smoke_node = vol_tree.nodes.new("LuxCoreNodeTexSmoke")
+    vol_tree.links.new(heterogeneous.outputs[0], vol_output.inputs[0])
+    vol_tree.links.new(smoke_node.outputs[0], heterogeneous.inputs["Scattering"])
+    smoke_node.domain = domain
+    heterogeneous.domain = domain
+    heterogeneous.auto_step_settings = True
+    heterogeneous.inputs["IOR"].default_value = 1
+
+    material = bpy.data.materials.new("Smoke")
+    mat_tree = bpy.data.node_groups.new("Nodes_Smoke", "luxcore_material_nodes")
+    mat_output = mat_tree.nodes.new("LuxCoreNodeMatOutput")
+    null = mat_tree.nodes.new("LuxCoreNodeMatNull")
+    pointer = mat_tree.nodes.new("LuxCoreNodeTreePointer")
+    pointer.node_tree = vol_tree
+    mat_tree.links.new(null.outputs[0], mat_output.inputs[0])
+    mat_tree.links.new(pointer.outputs["Volume"], mat_output.inputs["Interior Volume"])
+    material.luxcore.node_tree = mat_tree
+    domain_mesh.materials.append(material)
+
+    # Simulate, the export reads the grids of the current frame
+    for frame in range(1, frames + 1):
+        scene.frame_set(frame)
+    return SceneInfo({"resolution_max": resolution, "frames": frames})
+
+
+def build_pointer_trees(addon, scale):
+    """Materials that reference long chains of texture node trees through pointer nodes"""
+    materials = _scaled(100, scale)
+    depth = 32
+    cube_mesh = None
+
+    for m in range(materials):
+        previous_tree = None
+        for d in range(depth):
+            tex_tree = bpy.data.node_groups.new(
+                "Tex.%03d.%03d" % (m, d), "luxcore_texture_nodes"
+            )
+            tex_output = tex_tree.nodes.new("LuxCoreNodeTexOutput")
+            mix = tex_tree.nodes.new("LuxCoreNodeTexColorMix")
+            tex_tree.links.new(mix.outputs["Color"], tex_output.inputs["Color"])
+
+            if previous_tree:
+                source = tex_tree.nodes.new("LuxCoreNodeTreePointer")
+                source.node_tree = previous_tree
+                source_socket = source.outputs["Color"]
+            else:
+                source = tex_tree.nodes.new("LuxCoreNodeTexCheckerboard3D")
+                source_socket = source.outputs[0]
+            tex_tree.links.new(source_socket, mix.inputs["Color 1"])
+            previous_tree = tex_tree
+
+        material = _matte_material(addon, "Pointer.%03d" % m)
+        mat_tree = material.luxcore.node_tree
+        pointer = mat_tree.nodes.new("LuxCoreNodeTreePointer")
+        pointer.node_tree = previous_tree
+        matte = _find_node(mat_tree, "LuxCoreNodeMatMatte")
+        mat_tree.links.new(pointer.outputs["Color"], matte.inputs["Diffuse Color"])
+
+        if cube_mesh is None:
+            bm = bmesh.new()
+            bmesh.ops.create_cube(bm, size=1)
+            cube_mesh = bpy.data.meshes.new("PointerCube")
+            bm.to_mesh(cube_mesh)
+            bm.free()
+        mesh = cube_mesh.copy()
+        mesh.materials.append(material)
+        obj = _link(bpy.data.objects.new("Pointer.%03d" % m, mesh))
+        obj.location = ((m % 10) * 2, (m // 10) * 2, 0)
+
+    bpy.data.meshes.remove(cube_mesh)
+    return SceneInfo(
+        {"materials": materials, "pointer_depth": depth}, edit_object="Pointer.000"
+    )
+
+
+# Name -> builder, in the order they are run
+SCENES = {
+    "unique_meshes": build_unique_meshes,
+    "material_slots": build_material_slots,
+    "instances": build_instances,
+    "hair": build_hair,
+    "smoke": build_smoke,
+    "pointer_trees": build_pointer_trees,
+}
+
+
+def build_dense_mesh(addon, scale):
+    """
+    A single wavy grid for the mesh normals benchmark, every other face row is
+    flat shaded so split_faces() has to split the mesh along the row borders
+    """
+    faces = _scaled(10_000_000, scale)
+    segments = math.ceil(math.sqrt(faces))
+    mesh = _grid_mesh("DenseMesh", segments, size=100)
+
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)
+    coords[:, 2] = np.sin(coords[:, 0]) * np.cos(coords[:, 1])
+    mesh.vertices.foreach_set("co", coords.ravel())
+
+    rows = np.arange(len(mesh.polygons)) // segments
+    mesh.polygons.foreach_set("use_smooth", rows % 2 == 0)
+    mesh.update()
+
+    _link(bpy.data.objects.new("DenseMesh", mesh))
+    return SceneInfo({"faces": len(mesh.polygons)}, edit_object="DenseMesh")
+
+
+def build_film_scene(addon, resolution):
+    """A trivial scene for the FrameBufferFinal timings, which only depend on the film size"""
+    reset_scene(resolution)
+    mesh = _ico_sphere_mesh("FilmSphere", subdivisions=3, radius=10)
+    mesh.materials.append(_matte_material(addon, "Film"))
+    _link(bpy.data.objects.new("FilmSphere", mesh))
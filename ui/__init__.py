@@ -103,6 +103,7 @@ classes = (
     view_layer_aovs.LUXCORE_RENDERLAYER_PT_aovs_shadow,
     view_layer_aovs.LUXCORE_RENDERLAYER_PT_aovs_geometry,
     view_layer_aovs.LUXCORE_RENDERLAYER_PT_aovs_render,
+    view_layer_aovs.LUXCORE_RENDERLAYER_PT_aovs_refresh,
     world.LUXCORE_PT_context_world,
     world.LUXCORE_WORLD_PT_sky2,
     world.LUXCORE_WORLD_PT_infinite,
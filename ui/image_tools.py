@@ -1,6 +1,7 @@
 from bpy.types import Panel
 from .. import icons
 from ..utils import ui as utils_ui
+from ..utils.statistics import time_to_string
 from ..engine.base import LuxCoreRenderEngine, template_refresh_button
 from ..properties.denoiser import LuxCoreDenoiser
 from ..properties.display import LuxCoreDisplaySettings
@@ -119,6 +120,7 @@ class LUXCORE_IMAGE_PT_statistics(Panel, LuxCoreImagePanel):
         else:
             stats = statistics_collection[active_index]
             self.draw_stats(stats, layout)
+            self.draw_slowest_objects(stats, layout)
 
     @staticmethod
     def icon(stat, other_stat):
@@ -154,6 +156,23 @@ class LUXCORE_IMAGE_PT_statistics(Panel, LuxCoreImagePanel):
             for stat in stat_list:
                 col.label(text=str(stat))
 
+    def draw_slowest_objects(self, stats, layout):
+        slowest_objects = stats.slowest_objects.value
+        if not slowest_objects:
+            return
+
+        layout.label(text="Slowest Objects (Export Profiler)")
+        box = layout.box()
+        split = box.split()
+
+        col = split.column()
+        for obj_name, _ in slowest_objects:
+            col.label(text=obj_name)
+
+        col = split.column()
+        for _, seconds in slowest_objects:
+            col.label(text=time_to_string(seconds))
+
     def draw_stat_comparison(self, context, stats, other_stats, layout):
         statistics_collection = context.scene.luxcore.statistics
 
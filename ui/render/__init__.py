@@ -12,6 +12,7 @@ classes = (
     caches.LUXCORE_RENDER_PT_caches_DLSC,
     caches.LUXCORE_RENDER_PT_caches_DLSC_advanced,
     caches.LUXCORE_RENDER_PT_caches_DLSC_persistence,
+    caches.LUXCORE_RENDER_PT_caches_mesh,
     config.LUXCORE_RENDER_PT_lightpaths,
     config.LUXCORE_RENDER_PT_lightpaths_bounces,
     config.LUXCORE_RENDER_PT_add_light_tracing,
@@ -22,6 +23,7 @@ classes = (
     devices.LUXCORE_RENDER_PT_devices,
     devices.LUXCORE_RENDER_PT_gpu_devices,
     devices.LUXCORE_RENDER_PT_cpu_devices,
+    devices.LUXCORE_RENDER_PT_export_performance,
     errorlog.LUXCORE_RENDER_PT_error_log,
     halt.LUXCORE_RENDER_PT_halt_conditions,
     halt.LUXCORE_RENDERLAYER_PT_halt_conditions,
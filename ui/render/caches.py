@@ -317,3 +317,29 @@ class LUXCORE_RENDER_PT_caches_DLSC_persistence(RenderButtonsPanel, Panel):
 
     def draw(self, context):
         draw_persistent_file_ui(context, self.layout, context.scene.luxcore.config.dls_cache)
+
+
+class LUXCORE_RENDER_PT_caches_mesh(RenderButtonsPanel, Panel):
+    COMPAT_ENGINES = {"LUXCORE"}
+    bl_label = "Mesh Cache"
+    bl_parent_id = "LUXCORE_RENDER_PT_caches"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.render.engine == "LUXCORE"
+
+    def draw_header(self, context):
+        self.layout.prop(context.scene.luxcore.config.mesh_cache, "enabled", text="")
+
+    def draw(self, context):
+        mesh_cache = context.scene.luxcore.config.mesh_cache
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+
+        layout.active = mesh_cache.enabled
+
+        col = layout.column(align=True)
+        col.prop(mesh_cache, "directory")
+        col.prop(mesh_cache, "max_size")
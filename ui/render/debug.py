@@ -26,3 +26,4 @@ class LUXCORE_RENDER_PT_debug_settings(RenderButtonsPanel, Panel):
         col.active = debug.enabled
         col.prop(debug, "use_opencl_cpu")
         col.prop(debug, "print_properties")
+        col.prop(debug, "profile_export")
@@ -154,3 +154,20 @@ class LUXCORE_RENDER_PT_cpu_devices(RenderButtonsPanel, Panel):
         sub = layout.column(align=True)
         sub.enabled = context.scene.render.threads_mode == "FIXED"
         sub.prop(context.scene.render, "threads")
+
+
+class LUXCORE_RENDER_PT_export_performance(RenderButtonsPanel, Panel):
+    COMPAT_ENGINES = {"LUXCORE"}
+    bl_label = "Export Performance"
+    bl_parent_id = "LUXCORE_RENDER_PT_devices"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        config = context.scene.luxcore.config
+
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+
+        layout.prop(config, "instancing_chunk_size")
+        layout.prop(config, "weld_vertices")
@@ -46,11 +46,21 @@ class LUXCORE_RENDER_PT_error_log(RenderButtonsPanel, Panel):
 
             text = elem.message
             if elem.count > 1:
-                text += str(elem.count) + "x"
+                text += " (%dx)" % elem.count
 
-            row.label(text=elem.message, icon=icon)
-            if elem.obj_name:
+            row.label(text=text, icon=icon)
+            if elem.obj_count == 1:
                 op = row.operator("luxcore.select_object", text="", icon=icons.OBJECT)
                 op.obj_name = elem.obj_name
             op = row.operator("luxcore.copy_error_to_clipboard", icon=icons.COPY_TO_CLIPBOARD)
             op.message = elem.message
+
+            if elem.obj_count > 1:
+                # Only a sample of the affected objects is stored
+                sub = box.column(align=True)
+                for obj_name in elem.obj_names:
+                    op = sub.operator("luxcore.select_object", text=obj_name, icon=icons.OBJECT)
+                    op.obj_name = obj_name
+                hidden_count = elem.obj_count - len(elem.obj_names)
+                if hidden_count > 0:
+                    sub.label(text="... and %d more objects" % hidden_count)
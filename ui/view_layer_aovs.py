@@ -211,3 +211,31 @@ class LUXCORE_RENDERLAYER_PT_aovs_render(ViewLayerButtonsPanel, Panel):
         col = flow.column()
         col.prop(aovs, "noise")
         col.prop(aovs, "samplecount")
+
+
+class LUXCORE_RENDERLAYER_PT_aovs_refresh(ViewLayerButtonsPanel, Panel):
+    bl_label = "Film Refresh"
+    COMPAT_ENGINES = {"LUXCORE"}
+    bl_parent_id = "LUXCORE_RENDERLAYER_PT_aovs"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+
+        active_layer = context.window.view_layer
+        aovs = active_layer.luxcore.aovs
+
+        col = layout.column(align=True)
+        col.prop(aovs, "refresh_basic")
+        col.prop(aovs, "refresh_material_object")
+        col.prop(aovs, "refresh_light")
+        col.prop(aovs, "refresh_geometry")
+        col.prop(aovs, "refresh_render")
+
+        policies = {aovs.refresh_basic, aovs.refresh_material_object, aovs.refresh_light,
+                    aovs.refresh_geometry, aovs.refresh_render}
+        col = layout.column()
+        col.active = "AFTER_SAMPLES" in policies
+        col.prop(aovs, "refresh_samples")
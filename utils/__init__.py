@@ -349,12 +349,20 @@ def is_instance_visible(dg_obj_instance, obj, context):
     
     if context:
         viewport_vis_obj = dg_obj_instance.parent if dg_obj_instance.parent else obj
-        if not viewport_vis_obj.visible_in_viewport_get(context.space_data):
+        if not is_visible_in_viewport(viewport_vis_obj, context):
             return False
         
     return is_obj_visible(obj)
 
 
+def is_visible_in_viewport(obj, context):
+    if context.space_data is None:
+        # No 3D viewport to check against, e.g. in the headless export benchmark
+        # (scripts/export_benchmark), only the render visibility is known
+        return True
+    return obj.visible_in_viewport_get(context.space_data)
+
+
 def is_obj_visible(obj):
     if obj.luxcore.exclude_from_render:
         return False
@@ -1,3 +1,4 @@
+from time import time
 import bpy
 from ..utils.node import find_nodes, TREE_TYPES, ThinFilmCoating
 
@@ -7,12 +8,42 @@ Contains functions that ensure backwards compatibility,
 e.g. replace old nodes with updated ones when socket names change.
 """
 
+# Stored in node trees and scenes after the updates were applied to them, so they
+# are only checked once. Increment when adding a new update function.
+VERSION = 1
+
+# Datablocks that were updated but can't store the version, e.g. because they are
+# linked or because run() is called during rendering, where writing to IDs is not
+# allowed. Contains name_full strings, cleared when a new .blend is loaded.
+_updated_datablocks = set()
+
+
+def reset():
+    _updated_datablocks.clear()
+
+
+def _needs_update(datablock, version_owner):
+    return (version_owner.compatibility_version < VERSION
+            and datablock.name_full not in _updated_datablocks)
+
+
+def _mark_updated(datablock, version_owner):
+    try:
+        version_owner.compatibility_version = VERSION
+    except AttributeError:
+        _updated_datablocks.add(datablock.name_full)
+
 
 def run():
+    start = time()
+    checked_node_trees = 0
+    checked_scenes = 0
+
     for node_tree in bpy.data.node_groups:
-        if node_tree.bl_idname not in TREE_TYPES:
+        if node_tree.bl_idname not in TREE_TYPES or not _needs_update(node_tree, node_tree):
             continue
 
+        checked_node_trees += 1
         update_mat_output_volume_change(node_tree)
         update_glossy_ior_change(node_tree)
         update_volume_asymmetry_change(node_tree)
@@ -26,8 +57,13 @@ def run():
         update_glass_disney_add_film_sockets(node_tree)
         update_invert_add_maximum_input(node_tree)
         update_brick_texture(node_tree)
+        _mark_updated(node_tree, node_tree)
 
     for scene in bpy.data.scenes:
+        if not _needs_update(scene, scene.luxcore):
+            continue
+
+        checked_scenes += 1
         config = scene.luxcore.config
         # Reworked after v2.2beta4, DLSC is no longer part of the light strategy enum, but a separate checkbox.
         # Commit: 87ef293cdac2011da28365941414f88ff2658903
@@ -37,15 +73,22 @@ def run():
             # Restore the default here and enable the new DLSC BoolProperty
             config.light_strategy = "LOG_POWER"
             config.dls_cache.enabled = True
+        _mark_updated(scene, scene.luxcore)
 
     # Since commit 28a45283c249085ec1ae8ff38665f6d3655bb998 we use the Cycles DOF properties instead
     # of our own. Apply the old properties if an old scene uses them.
+    # Cameras have no version stamp, but this loop is cheap and also catches appended cameras.
     for camera in bpy.data.cameras:
         if camera.luxcore.use_dof:
             camera.dof.use_dof = True
             camera.dof.aperture_fstop = camera.luxcore.fstop
             camera.luxcore.use_dof = False
 
+    # run() is called on every export, only report when there was something to check
+    if checked_node_trees or checked_scenes:
+        print(f"[Compatibility] Checked {checked_node_trees} of {len(bpy.data.node_groups)} node trees "
+              f"and {checked_scenes} scenes in {(time() - start) * 1000:.1f} ms")
+
 
 def update_mat_output_volume_change(node_tree):
     # commit 3078719a9a33a7e2a798965294463dce6c8b7749
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 import bpy
 from . import ui as utils_ui
 
@@ -13,10 +14,20 @@ def update_ui():
 
 
 class LuxCoreError:
-    def __init__(self, message, obj_name):
-        self.message = str(message)
-        self.count = 1
-        self.obj_name = obj_name
+    """All occurrences of one message, with a sample of the affected objects"""
+
+    # Only this many object names are kept per message, the others are only counted
+    MAX_OBJ_NAMES = 10
+
+    def __init__(self, message):
+        self.message = message
+        self.count = 0
+        self.obj_count = 0
+        self.obj_names = []
+
+    @property
+    def obj_name(self):
+        return self.obj_names[0] if self.obj_names else ""
 
 
 class LuxCoreErrorLog:
@@ -30,30 +41,90 @@ class LuxCoreErrorLog:
     """
     errors = []
     warnings = []
+    # {(collection id, message): LuxCoreError}
+    _messages = {}
+    # {(collection id, message, obj_name)}, to count every object only once per message
+    _occurrences = set()
+    # Set when warnings were added, the error log panel is redrawn in refresh_ui()
+    _needs_ui_update = False
+    # [(obj_name, list)], see record()
+    _recorders = []
 
     @classmethod
     def add_error(cls, message, obj_name=""):
         cls._add("ERROR:", cls.errors, message, obj_name)
+        # Errors abort the render, so they are shown immediately
+        cls.refresh_ui()
 
     @classmethod
     def add_warning(cls, message, obj_name=""):
         cls._add("WARNING:", cls.warnings, message, obj_name)
 
+    @classmethod
+    @contextmanager
+    def record(cls, obj_name):
+        """
+        Collect the (is_error, message) tuples that are added for obj_name in the with-block,
+        so they can be added for other objects with replay() when the result is re-used
+        """
+        recorded = []
+        recorder = (obj_name, recorded)
+        cls._recorders.append(recorder)
+        try:
+            yield recorded
+        finally:
+            cls._recorders.remove(recorder)
+
+    @classmethod
+    def replay(cls, recorded, obj_name):
+        for is_error, message in recorded:
+            if is_error:
+                cls.add_error(message, obj_name)
+            else:
+                cls.add_warning(message, obj_name)
+
     @classmethod
     def clear(cls, force_ui_update=True):
         cls.errors.clear()
         cls.warnings.clear()
+        cls._messages.clear()
+        cls._occurrences.clear()
+        cls._needs_ui_update = False
         update_ui()
 
+    @classmethod
+    def refresh_ui(cls):
+        """
+        Redraw the error log panel if something was added since the last call.
+        Called once at the end of each export phase instead of after every warning.
+        """
+        if cls._needs_ui_update:
+            cls._needs_ui_update = False
+            update_ui()
+
     @classmethod
     def _add(cls, prefix, collection, message, obj_name):
-        for elem in collection:
-            if elem.message == message and elem.obj_name == obj_name:
-                elem.count += 1
-                # print("Error or warning already logged. Abort adding to collection.")
-                return
-
-        print(prefix, message)
-        new = LuxCoreError(message, obj_name)
-        collection.append(new)
-        update_ui()
+        message = str(message)
+        for recorder_obj_name, recorded in cls._recorders:
+            if obj_name == recorder_obj_name:
+                recorded.append((collection is cls.errors, message))
+
+        message_key = (id(collection), message)
+        elem = cls._messages.get(message_key)
+
+        if elem is None:
+            print(prefix, message)
+            elem = LuxCoreError(message)
+            cls._messages[message_key] = elem
+            collection.append(elem)
+            cls._needs_ui_update = True
+
+        elem.count += 1
+
+        occurrence = (id(collection), message, obj_name)
+        if obj_name and occurrence not in cls._occurrences:
+            cls._occurrences.add(occurrence)
+            elem.obj_count += 1
+            if len(elem.obj_names) < LuxCoreError.MAX_OBJ_NAMES:
+                elem.obj_names.append(obj_name)
+                cls._needs_ui_update = True
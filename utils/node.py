@@ -258,6 +258,94 @@ def has_nodes_multi(node_tree, bl_idname_set, follow_pointers):
     return False
 
 
+class NodeTreeFeatures:
+    """
+    The node types used in a node tree and in all node trees reached through its
+    pointer nodes, plus the flags that depend on node settings, collected in one
+    traversal. Use get_node_tree_features() to get a cached instance.
+    """
+
+    def __init__(self, node_tree):
+        self.node_types = set()
+        self.uses_random_per_island_int = False
+        self.needs_edge_detector_shape = False
+        self._collect(node_tree, set(), set())
+
+    def has_nodes(self, bl_idname):
+        return bl_idname in self.node_types
+
+    def has_nodes_multi(self, bl_idname_set):
+        return not self.node_types.isdisjoint(bl_idname_set)
+
+    @property
+    def uses_pointiness(self):
+        # TODO better check would be if the node is linked to the output and actually used
+        return "LuxCoreNodeTexPointiness" in self.node_types
+
+    @property
+    def uses_random_per_island_uniform_float(self):
+        # TODO better check would be if the node is linked to the output and actually used
+        return "LuxCoreNodeTexRandomPerIsland" in self.node_types
+
+    @property
+    def uses_displacement(self):
+        return self.has_nodes_multi({
+            "LuxCoreNodeShapeHeightDisplacement",
+            "LuxCoreNodeShapeVectorDisplacement",
+        })
+
+    def _collect(self, node_tree, visited, parents):
+        tree_key = node_tree.as_pointer()
+        visited.add(tree_key)
+        parents.add(tree_key)
+
+        for node in node_tree.nodes:
+            bl_idname = node.bl_idname
+            self.node_types.add(bl_idname)
+
+            if bl_idname == "LuxCoreNodeTreePointer":
+                pointed_tree = node.node_tree
+                if not pointed_tree:
+                    continue
+                pointed_key = pointed_tree.as_pointer()
+
+                if pointed_key in parents:
+                    msg = (f'Pointer nodes in node trees "{node_tree.name}" and "{pointed_tree.name}" '
+                           "create a dependency cycle! Delete one of them.")
+                    LuxCoreErrorLog.add_error(msg)
+                    # Mark the faulty nodes in red
+                    node.use_custom_color = True
+                    node.color = (0.9, 0, 0)
+                elif pointed_key not in visited:
+                    self._collect(pointed_tree, visited, parents)
+            elif bl_idname in {"LuxCoreNodeTexMapping2D", "LuxCoreNodeTexMapping3D"}:
+                # TODO better check would be if the node is linked to the output and actually used
+                if (node.mapping_type in {"uvrandommapping2d", "localrandommapping3d"}
+                        and node.seed_type == "mesh_islands"):
+                    self.uses_random_per_island_int = True
+            elif bl_idname == "LuxCoreNodeTexWireframe":
+                if node.hide_planar_edges:
+                    self.needs_edge_detector_shape = True
+
+        parents.discard(tree_key)
+
+
+def get_node_tree_features(node_tree, cache=None):
+    """
+    cache: dict that keeps the results, e.g. the Exporter's node_tree_features.
+    The owner has to clear it when node trees are edited.
+    """
+    if cache is None:
+        return NodeTreeFeatures(node_tree)
+
+    key = node_tree.as_pointer()
+    try:
+        return cache[key]
+    except KeyError:
+        features = cache[key] = NodeTreeFeatures(node_tree)
+        return features
+
+
 def force_viewport_update(_, context):
     """
     Since Blender 2.80, properties on custom sockets and custom nodes are not listed
@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+
+# Returned by span() when profiling is disabled, so the instrumented code
+# only pays for one attribute lookup and an empty with-block
+_DISABLED_SPAN = nullcontext()
+
+
+class ExportProfiler:
+    """
+    Records nested timing spans of the scene export in the Chrome trace event format.
+    The written file can be opened in chrome://tracing or https://ui.perfetto.dev
+    Spans are nested by time, so they don't need to know their parent, and spans
+    recorded on the mesh pipeline threads show up as separate tracks.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.events = []
+        # {obj_name: seconds spent converting the object, including the mesh pipeline threads}
+        self.object_times = {}
+        self._object_times_lock = threading.Lock()
+        # The object span that is open on each thread, see wait_span()
+        self._local = threading.local()
+        self._start_time = perf_counter()
+
+    def span(self, name, obj_name="", **args):
+        """
+        Context manager that records the time spent in its block.
+        args are shown in the trace viewer (e.g. byte counts), they should be cheap to compute.
+        """
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, name, obj_name, args, is_object=False)
+
+    def object_span(self, obj_name):
+        """Like span(), but the time is also accumulated for the slowest objects table"""
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, "Object", obj_name, {}, is_object=True)
+
+    def wait_span(self, name):
+        """
+        Like span(), but the time is not counted for the object span that is open on this
+        thread. Used for waiting on work of other objects, e.g. the mesh pipeline.
+        """
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, name, "", {}, is_object=False, is_wait=True)
+
+    def get_slowest_objects(self, count=20):
+        """Returns a list of (obj_name, seconds) tuples, slowest first"""
+        items = sorted(self.object_times.items(), key=lambda item: item[1], reverse=True)
+        return items[:count]
+
+    def write(self, filepath):
+        with open(filepath, "w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+    def _add(self, name, obj_name, args, start, end, is_object, excluded_time=0):
+        if obj_name:
+            args["object"] = obj_name
+            name = f"{name}: {obj_name}"
+        # list.append() is atomic, no lock needed for the mesh pipeline threads
+        self.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._start_time) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+        if is_object:
+            duration = end - start - excluded_time
+            with self._object_times_lock:
+                self.object_times[obj_name] = self.object_times.get(obj_name, 0) + duration
+
+
+class _Span:
+    __slots__ = (
+        "profiler", "name", "obj_name", "args", "is_object", "is_wait", "start",
+        "excluded_time", "outer_object_span",
+    )
+
+    def __init__(self, profiler, name, obj_name, args, is_object, is_wait=False):
+        self.profiler = profiler
+        self.name = name
+        self.obj_name = obj_name
+        self.args = args
+        self.is_object = is_object
+        self.is_wait = is_wait
+        self.start = 0
+        self.excluded_time = 0
+        self.outer_object_span = None
+
+    def __enter__(self):
+        if self.is_object:
+            local = self.profiler._local
+            self.outer_object_span = getattr(local, "object_span", None)
+            local.object_span = self
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = perf_counter()
+        local = self.profiler._local
+        if self.is_object:
+            local.object_span = self.outer_object_span
+        elif self.is_wait:
+            object_span = getattr(local, "object_span", None)
+            if object_span:
+                object_span.excluded_time += end - self.start
+
+        self.profiler._add(
+            self.name, self.obj_name, self.args, self.start, end, self.is_object,
+            self.excluded_time,
+        )
+        return False
@@ -63,6 +63,19 @@ def triangle_count_to_string(triangle_count):
         return "{:,}".format(triangle_count)
 
 
+def vertex_welding_to_string(counts):
+    # Number of exported loops and of vertices after welding
+    loop_count, vertex_count = counts
+    if not loop_count:
+        return "Disabled"
+    reduction = 1 - vertex_count / loop_count
+    return "%s -> %s (-%d%%)" % (
+        triangle_count_to_string(loop_count),
+        triangle_count_to_string(vertex_count),
+        round(reduction * 100),
+    )
+
+
 def path_depths_to_string(depths):
     if not depths:
         return ""